@@ -0,0 +1,200 @@
+"""
+Microbenchmarks for the lyrics engine and the UI update paths.
+
+    python benchmark.py [--output results.json] [--baseline baseline.json] [--save-baseline baseline.json]
+
+No Spotify account or network is needed, the UI benchmarks run headless against synthetic songs.
+Results are written as JSON (ops/sec and peak memory per benchmark). With --baseline every result is
+compared to the saved one and the exit code is 1 if any benchmark got slower than the tolerance allows.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import tracemalloc
+
+from spotify import Lyrics, SpotifyPlayer
+from fakespotify import SimulatedClock, FakeSpotify, makeLibrary, makeLrc, getOfflineFiles
+
+def makeSongLrc(lineCount, seed=0) -> str:
+    """Builds a synthetic synced LRC text with lineCount lines of varying length, one every 3.5 seconds."""
+    return(makeLrc([i * 3.5 for i in range(lineCount)], random.Random(seed)))
+
+class OfflinePlayer(SpotifyPlayer):
+    """SpotifyPlayer playing a synthetic song, without touching the network."""
+    def __init__(self, workDir, lrc):
+        super().__init__(connect=False, transport=lambda: FakeSpotify(makeLibrary(trackCount=1), clock=SimulatedClock()),
+                         **getOfflineFiles(workDir))
+        self.connected = True
+        self.setLyrics(lrc)
+
+    def setLyrics(self, lrc) -> None:
+        lyrics = Lyrics(lrc)
+        self.song.publish(connected=True, lyrics=lyrics, isPlaying=True, duration=lyrics.getTimestamp(lyrics.getLineCount() - 1) + 5)
+
+    def startInBackground(self, callback=None, playlistsCallback=None) -> None:
+        pass
+
+    def startUpdateLoop(self, updateInterval=None, callback=None) -> None:
+        pass
+
+    def loadPlaylists(self, callback=None) -> None:
+        pass
+
+def bench(func, opsPerCall=1, minTime=0.2, repeats=3) -> dict:
+    """Returns the best ops/sec of func over repeats runs of minTime seconds, and the peak memory of one call."""
+    func()  #< Warm up
+    best = 0.0
+    for _ in range(repeats):
+        calls = 0
+        start = time.perf_counter()
+        while True:
+            func()
+            calls += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= minTime:
+                break
+        best = max(best, calls * opsPerCall / elapsed)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return({"opsPerSec": best, "peakBytes": peak})
+
+def lyricsBenchmarks(workDir) -> dict:
+    results = {}
+    for name, lineCount in (("small", 40), ("large", 5000)):
+        lrc = makeSongLrc(lineCount)
+        lyrics = Lyrics(lrc)
+        duration = lyrics.getTimestamp(lineCount - 1) + 5
+        rng = random.Random(1)
+        times = [rng.uniform(0, duration) for _ in range(1000)]
+        player = OfflinePlayer(workDir, lrc)
+
+        results[f"lyrics.parse.{name}"] = bench(lambda: Lyrics(lrc))
+        results[f"lyrics.getNearestTimestamp.{name}"] = bench(lambda: [lyrics.getNearestTimestamp(t) for t in times], opsPerCall=len(times))
+        results[f"player.getCurrentLyricIndex.{name}"] = bench(lambda: [player.getCurrentLyricIndex(at=t) for t in times], opsPerCall=len(times))
+        results[f"lyrics.getLyrics.{name}"] = bench(lyrics.getLyrics)
+    return(results)
+
+MOUSE_PATH = [(x * 13 % 800, 300 + x % 40) for x in range(60)]  #< Several moves per frame, across the controls
+
+def moveMouse(player) -> None:
+    from kivy.clock import Clock
+    from kivy.core.window import Window
+    for pos in MOUSE_PATH:
+        Window.mouse_pos = pos
+    Clock.tick()
+
+def uiBenchmarks(workDir) -> dict:
+    """Runs the UI update paths headless, returns nothing if Kivy cannot start."""
+    if not os.environ.get("DISPLAY") and sys.platform.startswith("linux"):
+        os.environ.setdefault("SDL_VIDEODRIVER", "offscreen")  #< No window system, render off screen
+        os.environ.setdefault("KIVY_GL_BACKEND", "mock")
+    os.environ.setdefault("KIVY_NO_ARGS", "1")
+    os.environ.setdefault("KCFG_GRAPHICS_MAXFPS", "0")  #< Clock.tick must not sleep to hold a frame rate
+    try:
+        import main
+        from kivy.clock import Clock
+        from kivy.core.window import Window
+    except Exception as e:
+        print(f"Skipping the UI benchmarks, Kivy could not start: {e}")
+        return({})
+
+    lines = ["a short line", "a somewhat longer line of lyrics for the font size", "x" * 120]
+    results = {"ui.calcFontSize": bench(lambda: [main.calcFontSize(line, 300, 24) for line in lines], opsPerCall=len(lines))}
+    for name, lineCount in (("small", 40), ("large", 2000)):
+        backend = OfflinePlayer(workDir, makeSongLrc(lineCount))
+        player = main.MiniSpotifyPlayer(backend=backend, imageFolder=os.path.join(os.path.dirname(os.path.abspath(__file__)), "images"))
+        Window.add_widget(player)
+        duration = backend.getSongDuration()
+        clock = {"t": 0.0, "song": 0}
+
+        def advance():
+            clock["t"] = (clock["t"] + 3.5) % duration  #< Every call lands on the next line
+            backend.song.setPosition(clock["t"])
+
+        def updateLyrics():
+            advance()
+            player._update_lyrics()
+
+        def updateHighlight():
+            advance()
+            player._update_lyrics_highlight()
+
+        def switchLineRendered():
+            updateHighlight()
+            Clock.tick()  #< Lays out the lyrics view and renders the changed lines
+
+        def toggleLineRendered():
+            clock["toggles"] = clock.get("toggles", 0) + 1  #< Between the current line and the next, so the view never scrolls
+            player._set_highlighted_line(player.current_index + clock["toggles"] % 2, backend.getSnapshot().lyrics)
+            Clock.tick()
+
+        def songChange():
+            clock["song"] += 1
+            backend.setLyrics(makeSongLrc(lineCount, seed=clock["song"]))
+            player._update_lyrics()
+
+        results[f"ui.update_lyrics.{name}"] = bench(updateLyrics)
+        results[f"ui.update_lyrics_highlight.{name}"] = bench(updateHighlight)
+        results[f"ui.update_lyrics_highlight.rendered.{name}"] = bench(switchLineRendered)
+        results[f"ui.set_highlighted_line.rendered.{name}"] = bench(toggleLineRendered)
+        results[f"ui.update_lyrics.songChange.{name}"] = bench(songChange, minTime=0.5, repeats=1)
+        if name == "small":
+            results["ui.mouse_move"] = bench(lambda: moveMouse(player), opsPerCall=len(MOUSE_PATH))
+        Window.remove_widget(player)
+    return(results)
+
+def compare(results, baseline, tolerance) -> list:
+    """Adds the ratio to the baseline to every result, returns the names of the regressed benchmarks."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base or not base.get("opsPerSec"):
+            continue
+        result["baselineRatio"] = result["opsPerSec"] / base["opsPerSec"]
+        if result["baselineRatio"] < 1 - tolerance:
+            regressions.append(name)
+    return(regressions)
+
+def run():
+    parser = argparse.ArgumentParser(description="Microbenchmarks for the lyrics engine and the UI update paths.")
+    parser.add_argument("--output", help="write the results as JSON to this file (default: stdout)")
+    parser.add_argument("--baseline", help="compare against the results saved in this file")
+    parser.add_argument("--save-baseline", help="save the results as the new baseline in this file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown against the baseline (default: 0.2)")
+    parser.add_argument("--no-ui", action="store_true", help="skip the headless UI benchmarks")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workDir:
+        results = lyricsBenchmarks(workDir)
+        if not args.no_ui:
+            results.update(uiBenchmarks(workDir))
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            regressions = compare(results, json.load(f)["results"], args.tolerance)
+
+    report = {"python": platform.python_version(), "platform": platform.platform(), "time": time.time(), "results": results}
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    for name in regressions:
+        print(f"Regression: {name} runs at {results[name]['baselineRatio']:.0%} of the baseline", file=sys.stderr)
+    sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    run()
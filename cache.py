@@ -0,0 +1,175 @@
+import os
+import re
+import json
+import time
+import atexit
+import threading
+from collections import OrderedDict
+
+def writeJsonAtomic(path, data) -> None:
+    """Writes data as JSON through a temporary file, so a crash never leaves a half written file behind."""
+    tmpFile = path + ".tmp"
+    with open(tmpFile, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmpFile, path)
+
+def readJson(path, default=None):
+    """Reads a JSON file, returning default if it does not exist or cannot be parsed."""
+    if not path or not os.path.exists(path):
+        return(default)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return(json.load(f))
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable file {path}: {e}")
+        return(default)
+
+def normalizeName(title, artist) -> str:
+    """Builds the fallback cache key ("title - artist") in a case and whitespace insensitive form."""
+    name = "{} - {}".format(title or "", artist or "")
+    return(re.sub(r"\s+", " ", name).strip().casefold())
+
+class LyricsCache:
+    """
+    Persistent LRU cache of raw LRC text.
+    Entries are keyed by the Spotify track id, with a normalized "title - artist" fallback key.
+    "No lyrics found" results are cached too, but expire after negativeTtl seconds.
+    Changes are written to disk saveDelay seconds after the first unsaved one (and at exit), off the caller's thread.
+    """
+    MISS = object()  #< Returned by lookup when nothing usable is cached
+
+    def __init__(self, cacheFile="lyricsCache.json", maxEntries=500, maxBytes=8*1024*1024, negativeTtl=24*60*60, saveDelay=2.0):
+        self.cacheFile = cacheFile
+        self.maxEntries = maxEntries
+        self.maxBytes = maxBytes
+        self.negativeTtl = negativeTtl
+        self.saveDelay = saveDelay
+        self.hits = 0
+        self.misses = 0
+        self.negativeHits = 0
+        self.evictions = 0
+
+        self._entries = OrderedDict()  #< key -> {"lrc": str|None, "name": str, "storedAt": float}, oldest first
+        self._names = {}               #< normalized name -> key
+        self._size = 0
+        self._lock = threading.Lock()
+        self._saveLock = threading.Lock()  #< Serializes the file writes, which happen without _lock held
+        self._saveTimer = None             #< Set while there are unsaved changes
+        self._load()
+        atexit.register(self.flush)
+
+    def _load(self) -> None:
+        entries = readJson(self.cacheFile, default=[])
+        for key, entry in entries:  #< Stored as a list of pairs to keep the LRU order
+            self._insert(key, entry)
+        self._evict()
+
+    def _scheduleSave(self) -> None:
+        """Must be called holding _lock, several changes within saveDelay seconds are written once."""
+        if not self.cacheFile or self._saveTimer != None:
+            return
+        self._saveTimer = threading.Timer(self.saveDelay, self.flush)
+        self._saveTimer.daemon = True
+        self._saveTimer.start()
+
+    def flush(self) -> None:
+        """Writes the unsaved changes now. Lookups only wait for the entries to be copied, not for the write."""
+        with self._saveLock:
+            with self._lock:
+                if self._saveTimer == None:
+                    return
+                self._saveTimer.cancel()
+                self._saveTimer = None
+                entries = list(self._entries.items())  #< Entries are replaced, never changed, so a shallow copy is enough
+            try:
+                writeJsonAtomic(self.cacheFile, entries)
+            except OSError as e:
+                print(f"Failed to save lyrics cache {self.cacheFile}: {e}")
+
+    def _entrySize(self, entry) -> int:
+        return(len(entry["lrc"] or "") + len(entry["name"]))
+
+    def _insert(self, key, entry) -> None:
+        self._remove(key)
+        self._entries[key] = entry
+        self._names[entry["name"]] = key
+        self._size += self._entrySize(entry)
+
+    def _remove(self, key) -> None:
+        entry = self._entries.pop(key, None)
+        if entry == None:
+            return
+        if self._names.get(entry["name"]) == key:
+            del self._names[entry["name"]]
+        self._size -= self._entrySize(entry)
+
+    def _evict(self) -> None:
+        while self._entries and (len(self._entries) > self.maxEntries or self._size > self.maxBytes):
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _findKey(self, trackId, name):
+        if trackId and trackId in self._entries:
+            return(trackId)
+        return(self._names.get(name))
+
+    def lookup(self, trackId=None, title=None, artist=None):
+        """
+        Returns the cached LRC text (None for a cached "no lyrics found" result),
+        or LyricsCache.MISS if the song has to be looked up.
+        """
+        name = normalizeName(title, artist)
+        with self._lock:
+            key = self._findKey(trackId, name)
+            entry = self._entries.get(key) if key else None
+            if entry != None and entry["lrc"] == None and time.time() - entry["storedAt"] > self.negativeTtl:
+                self._remove(key)  #< Expired negative result, the providers may have the lyrics by now
+                entry = None
+
+            if entry == None:
+                self.misses += 1
+                return(self.MISS)
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            if entry["lrc"] == None:
+                self.negativeHits += 1
+            return(entry["lrc"])
+
+    def contains(self, trackId) -> bool:
+        """Returns True if usable lyrics (or a fresh "no lyrics found" result) are cached for trackId, without counting a lookup."""
+        with self._lock:
+            entry = self._entries.get(trackId)
+            return(entry != None and (entry["lrc"] != None or time.time() - entry["storedAt"] <= self.negativeTtl))
+
+    def store(self, lrc, trackId=None, title=None, artist=None) -> None:
+        """Caches the raw LRC text of a song, pass lrc=None to record that no lyrics were found."""
+        name = normalizeName(title, artist)
+        with self._lock:
+            self._insert(trackId or name, {"lrc": lrc, "name": name, "storedAt": time.time()})
+            self._evict()
+            self._scheduleSave()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._names.clear()
+            self._size = 0
+            self._scheduleSave()
+
+    def getStats(self) -> dict:
+        """Returns the hit/miss counters and the current size of the cache."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return({
+                "hits": self.hits,
+                "misses": self.misses,
+                "negativeHits": self.negativeHits,
+                "evictions": self.evictions,
+                "hitRate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._size
+            })
+
+    def __len__(self):
+        return(len(self._entries))
@@ -0,0 +1,371 @@
+"""
+Offline stand-ins for Spotify and the lyrics providers, used by the soak test (soak.py) and the benchmarks (benchmark.py).
+
+    clock = SimulatedClock()
+    library = makeLibrary(trackCount=30, playlistCount=120)
+    fake = FakeSpotify(library, clock=clock, faults=Faults(latency=(0.05, 0.3), errorRate=0.01, rateLimitRate=0.005))
+    player = SpotifyPlayer(transport=lambda: fake, lyricsProviders={"fake": FakeLyricsProvider(library, clock=clock)},
+                           clock=clock.now, sleep=clock.sleep, connect=False, **getOfflineFiles(workDir))
+
+FakeSpotify answers the spotipy methods the player uses from a scripted playback timeline,
+and knows the true playback state at any moment so the lyrics shown by the player can be checked against it.
+"""
+import os
+import random
+import threading
+from bisect import bisect_right
+from collections import Counter
+
+import spotipy
+
+class SimulatedClock:
+    """Monotonic clock that only moves when it is advanced, sleep() advances it instead of blocking."""
+    def __init__(self, start=0.0):
+        self.time = start
+        self._cond = threading.Condition()
+
+    def now(self) -> float:
+        return(self.time)
+
+    def advance(self, seconds) -> None:
+        with self._cond:
+            self.time += max(0.0, seconds)
+            self._cond.notify_all()
+
+    def sleep(self, seconds) -> None:
+        self.advance(seconds)
+
+    def waitFor(self, seconds) -> None:
+        """Blocks a background thread until whoever drives the clock has advanced it by seconds."""
+        with self._cond:
+            target = self.time + seconds
+            while self.time < target:
+                self._cond.wait(0.1)
+
+def getOfflineFiles(workDir) -> dict:
+    """The SpotifyPlayer arguments keeping the caches and queues of an offline run in workDir."""
+    return({
+        "lyricsCacheFile": os.path.join(workDir, "lyricsCache.json"),
+        "writeQueueFile": os.path.join(workDir, "writeQueue.json"),
+        "playlistsFile": os.path.join(workDir, "playlists.json")
+    })
+
+def makeLrc(lineTimes, rng) -> str:
+    """Builds a synced LRC text with a line of random words starting at each of lineTimes."""
+    words = ["love", "night", "baby", "dance", "forever", "heart", "tonight", "light", "fire", "dream"]
+    lines = []
+    for seconds in lineTimes:
+        text = " ".join(rng.choice(words) for _ in range(rng.randint(2, 8)))
+        lines.append(f"[{int(seconds // 60):02d}:{seconds % 60:05.2f}]{text}")
+    return("\n".join(lines))
+
+def makeLibrary(trackCount=30, playlistCount=10, seed=0) -> dict:
+    """
+    Builds a synthetic library: tracks with synced lyrics and playlists.
+    Every track keeps its true line start times in "lineTimes" (rounded like the LRC text) as the ground truth.
+    """
+    rng = random.Random(seed)
+    tracks = []
+    for i in range(trackCount):
+        duration = rng.uniform(120, 300)
+        lineTimes = []
+        seconds = rng.uniform(5, 15)
+        while seconds < duration - 5:
+            lineTimes.append(round(seconds, 2))
+            seconds += rng.uniform(2, 6)
+        tracks.append({
+            "id": f"track{i:04d}",
+            "name": f"Song {i}",
+            "artists": [{"name": f"Artist {i % 7}"}],
+            "album": {"name": f"Album {i % 5}"},
+            "duration_ms": int(duration * 1000),
+            "lineTimes": lineTimes,
+            "lrc": makeLrc(lineTimes, rng)
+        })
+    playlists = [{"id": f"playlist{i:04d}", "name": f"Playlist {i}", "snapshot_id": "0", "items": []} for i in range(playlistCount)]
+    return({"tracks": tracks, "playlists": playlists})
+
+def makeScript(duration, seed=0, pauseEvery=600, skipEvery=900, seekEvery=1200, idleEvery=3600) -> list:
+    """
+    Builds a random script of what happens on the user's device over duration seconds, as (time, action, *args) tuples.
+    Actions are "pause", "play", "next", "previous", "seek" (with a position in seconds), "idle" and "active".
+    Every *Every argument is the mean time between such events, None turns them off.
+    """
+    rng = random.Random(seed)
+    script = []
+    def schedule(every, events):
+        if not every:
+            return
+        at = rng.expovariate(1 / every)
+        while at < duration:
+            script.extend((at + offset, *event) for offset, event in events())
+            at += rng.expovariate(1 / every)
+
+    schedule(pauseEvery, lambda: [(0, ("pause",)), (rng.uniform(10, 180), ("play",))])
+    schedule(skipEvery, lambda: [(0, (rng.choice(["next", "next", "previous"]),))])
+    schedule(seekEvery, lambda: [(0, ("seek", rng.uniform(0, 120)))])
+    schedule(idleEvery, lambda: [(0, ("idle",)), (rng.uniform(60, 600), ("active",))])
+    return(sorted(script, key=lambda event: event[0]))
+
+class Faults:
+    """
+    Latency and failures injected into every FakeSpotify request (and FakeLyricsProvider lookup).
+    latency is a (min, max) range in seconds, errorRate the chance of a 5xx response, connectionErrorRate
+    the chance of a network error and rateLimitRate the chance of a 429 response with a retryAfter seconds Retry-After.
+    """
+    def __init__(self, latency=(0.0, 0.0), errorRate=0.0, connectionErrorRate=0.0, rateLimitRate=0.0, retryAfter=2, seed=0):
+        self.latency = latency
+        self.errorRate = errorRate
+        self.connectionErrorRate = connectionErrorRate
+        self.rateLimitRate = rateLimitRate
+        self.retryAfter = retryAfter
+        self.injected = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def getLatency(self) -> float:
+        with self._lock:
+            return(self._random.uniform(*self.latency))
+
+    def check(self, endpoint) -> None:
+        """Raises the error injected into this request, if any."""
+        with self._lock:
+            roll = self._random.random()
+        if roll < self.rateLimitRate:
+            self.injected["rateLimit"] += 1
+            raise spotipy.SpotifyException(429, -1, f"{endpoint}: Too many requests", headers={"Retry-After": str(self.retryAfter)})
+        roll -= self.rateLimitRate
+        if roll < self.errorRate:
+            self.injected["serverError"] += 1
+            raise spotipy.SpotifyException(503, -1, f"{endpoint}: Service unavailable")
+        roll -= self.errorRate
+        if roll < self.connectionErrorRate:
+            self.injected["connectionError"] += 1
+            raise ConnectionError(f"{endpoint}: Connection reset")
+
+class FakeAuthManager:
+    """Hands out tokens that expire after tokenLifetime simulated seconds, like SpotifyOAuth with a cached token."""
+    def __init__(self, clock, tokenLifetime=3600):
+        self.clock = clock
+        self.tokenLifetime = tokenLifetime
+        self.cache_handler = self
+        self.refreshes = 0
+        self.token = None
+
+    def _newToken(self) -> dict:
+        self.token = {"access_token": "fake", "refresh_token": "fake", "expires_at": self.clock.now() + self.tokenLifetime}
+        return(self.token)
+
+    def get_cached_token(self) -> dict:
+        return(self.token)
+
+    def get_access_token(self, as_dict=True):
+        token = self._newToken()
+        return(token if as_dict else token["access_token"])
+
+    def refresh_access_token(self, refreshToken) -> dict:
+        self.refreshes += 1
+        return(self._newToken())
+
+    def is_token_expired(self, tokenInfo) -> bool:
+        return(tokenInfo["expires_at"] - self.clock.now() < 60)
+
+class FakeSpotify:
+    """
+    In-process fake of the spotipy.Spotify methods the player uses.
+    Playback runs through the library's tracks in order (looping), driven by the clock and the scripted events,
+    and every request costs the injected latency in simulated time. The progress in a response is taken half way through it.
+    """
+    def __init__(self, library, clock:SimulatedClock, script=None, faults:Faults=None, tokenLifetime=3600):
+        self.tracks = library["tracks"]
+        self.playlists = library["playlists"]
+        self.clock = clock
+        self.script = list(script or [])
+        self.faults = faults or Faults()
+        self.auth_manager = FakeAuthManager(clock, tokenLifetime)
+        self.calls = Counter()
+        self.saved = []
+
+        self.index = 0             #< Playing track
+        self.anchorProgress = 0.0  #< Progress at anchorTime, playback moves on from there while playing
+        self.anchorTime = clock.now()
+        self.playing = True
+        self.active = True
+        self._nextEvent = 0
+        self._lock = threading.RLock()
+
+    def _progressAt(self, at) -> float:
+        return(self.anchorProgress + (at - self.anchorTime if self.playing else 0.0))
+
+    def _setProgress(self, progress, at) -> None:
+        self.anchorProgress = progress
+        self.anchorTime = at
+
+    def _skip(self, step, at) -> None:
+        self.index = (self.index + step) % len(self.tracks)
+        self._setProgress(0.0, at)
+
+    def _apply(self, event) -> None:
+        at, action = event[0], event[1]
+        self._setProgress(self._progressAt(at), at)
+        if action == "pause":
+            self.playing = False
+        elif action == "play":
+            self.playing = True
+        elif action == "next":
+            self._skip(1, at)
+        elif action == "previous":
+            self._skip(-1, at)
+        elif action == "seek":
+            self._setProgress(min(event[2], self.tracks[self.index]["duration_ms"] * 0.001), at)
+        elif action == "idle":
+            self.active = False
+        elif action == "active":
+            self.active = True
+
+    def _advance(self) -> None:
+        """Plays up to the current time, applying the scripted events and moving to the next track at the end of each."""
+        now = self.clock.now()
+        while True:
+            eventTime = self.script[self._nextEvent][0] if self._nextEvent < len(self.script) else float("inf")
+            trackEnd = float("inf")
+            if self.playing:
+                trackEnd = self.anchorTime + self.tracks[self.index]["duration_ms"] * 0.001 - self.anchorProgress
+            if trackEnd <= min(eventTime, now):
+                self._skip(1, trackEnd)
+            elif eventTime <= now:
+                self._apply(self.script[self._nextEvent])
+                self._nextEvent += 1
+            else:
+                return
+
+    def _request(self, endpoint) -> float:
+        """Counts the request and spends the first half of its latency, returns the other half."""
+        with self._lock:
+            self.calls[endpoint] += 1
+        halfLatency = self.faults.getLatency() / 2
+        self.clock.sleep(halfLatency)
+        return(halfLatency)
+
+    def _respond(self, endpoint, halfLatency, respond):
+        """Builds the response, spends the rest of the latency, then raises the injected error if there is one."""
+        with self._lock:
+            self._advance()
+            response = respond()
+        self.clock.sleep(halfLatency)
+        self.faults.check(endpoint)
+        return(response)
+
+    def getState(self) -> dict:
+        """Returns the true playback state right now, or None while no device is active."""
+        with self._lock:
+            self._advance()
+            if not self.active:
+                return(None)
+            return({"track": self.tracks[self.index], "progress": self._progressAt(self.clock.now()), "isPlaying": self.playing})
+
+    def _publicTrack(self, track) -> dict:
+        return({key: track[key] for key in ("id", "name", "artists", "album", "duration_ms")})
+
+    def current_playback(self, *args, **kwargs) -> dict:
+        halfLatency = self._request("current_playback")
+        def respond():
+            if not self.active:
+                return(None)
+            return({
+                "item": self._publicTrack(self.tracks[self.index]),
+                "is_playing": self.playing,
+                "progress_ms": int(self._progressAt(self.clock.now()) * 1000),
+                "timestamp": int(self.clock.now() * 1000)
+            })
+        return(self._respond("current_playback", halfLatency, respond))
+
+    def queue(self) -> dict:
+        halfLatency = self._request("queue")
+        def respond():
+            upcoming = [self.tracks[(self.index + i) % len(self.tracks)] for i in range(1, 21)]
+            return({"currently_playing": self._publicTrack(self.tracks[self.index]), "queue": [self._publicTrack(track) for track in upcoming]})
+        return(self._respond("queue", halfLatency, respond))
+
+    def seek_track(self, position_ms, device_id=None) -> None:
+        halfLatency = self._request("seek_track")
+        self._respond("seek_track", halfLatency, lambda: self._apply((self.clock.now(), "seek", position_ms * 0.001)))
+
+    def current_user(self) -> dict:
+        halfLatency = self._request("current_user")
+        return(self._respond("current_user", halfLatency, lambda: {"id": "fakeuser", "display_name": "Fake User"}))
+
+    def current_user_saved_tracks_add(self, tracks=None) -> None:
+        halfLatency = self._request("current_user_saved_tracks_add")
+        self._respond("current_user_saved_tracks_add", halfLatency, lambda: self.saved.extend(tracks or []))
+
+    def playlist_add_items(self, playlist_id, items, position=None) -> dict:
+        halfLatency = self._request("playlist_add_items")
+        def respond():
+            playlist = next((playlist for playlist in self.playlists if playlist["id"] == playlist_id), None)
+            if playlist == None:
+                raise spotipy.SpotifyException(404, -1, f"Playlist {playlist_id} not found")
+            playlist["items"].extend(items)
+            playlist["snapshot_id"] = str(int(playlist["snapshot_id"]) + 1)
+            return({"snapshot_id": playlist["snapshot_id"]})
+        return(self._respond("playlist_add_items", halfLatency, respond))
+
+    def current_user_playlists(self, limit=50, offset=0) -> dict:
+        halfLatency = self._request("current_user_playlists")
+        def respond():
+            page = self.playlists[offset:offset + limit]
+            return({
+                "items": [{"id": pl["id"], "name": pl["name"], "snapshot_id": pl["snapshot_id"]} for pl in page],
+                "next": "more" if offset + limit < len(self.playlists) else None,
+                "total": len(self.playlists)
+            })
+        return(self._respond("current_user_playlists", halfLatency, respond))
+
+class FakeLyricsProvider:
+    """
+    Lyrics provider answering "title - artist" searches from the library.
+    missRate is the chance a track has no lyrics at all (decided once per track). Lookups run on the lyrics worker threads,
+    so the latency is waited for on the clock (until the simulation has moved on that far) instead of advancing it.
+    """
+    def __init__(self, library, clock:SimulatedClock=None, latency=(0.0, 0.0), missRate=0.0, errorRate=0.0, seed=0):
+        self.clock = clock
+        self.latency = latency
+        self.errorRate = errorRate
+        self.calls = 0
+        self.inFlight = {}  #< Call number -> simulated time it answers at
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._lyrics = {}
+        for track in library["tracks"]:
+            if self._random.random() >= missRate:
+                self._lyrics["{} - {}".format(track["name"], track["artists"][0]["name"])] = track["lrc"]
+
+    def hasLyrics(self, track) -> bool:
+        return("{} - {}".format(track["name"], track["artists"][0]["name"]) in self._lyrics)
+
+    def __call__(self, searchTerm) -> str:
+        with self._lock:
+            self.calls += 1
+            call = self.calls
+            latency = self._random.uniform(*self.latency)
+            failed = self._random.random() < self.errorRate
+            self.inFlight[call] = (self.clock.now() if self.clock != None else 0.0) + latency
+        try:
+            if self.clock != None:
+                self.clock.waitFor(latency)
+            if failed:
+                raise ConnectionError(f"Lyrics provider failed for {searchTerm}")
+            return(self._lyrics.get(searchTerm))
+        finally:
+            with self._lock:
+                del self.inFlight[call]
+
+    def hasDueCalls(self, now) -> bool:
+        """Returns True while a lookup that should have answered by now is still running."""
+        with self._lock:
+            return(any(due <= now for due in self.inFlight.values()))
+
+def getTrueLineTimestamp(track, progress) -> float:
+    """Returns the start time of the lyric line being sung at progress according to the library, 0.0 before the first line."""
+    index = bisect_right(track["lineTimes"], progress) - 1
+    return(track["lineTimes"][index] if index >= 0 else 0.0)
@@ -1,23 +1,31 @@
+import time
+STARTED_AT = time.perf_counter()  #< Startup timings are measured from here
 import os
 os.environ["KIVY_NO_CONSOLELOG"] = "1"
-import threading
-import time
+import weakref
+from collections import OrderedDict
 
 from kivy.app import App
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.floatlayout import FloatLayout
 from kivy.uix.image import Image
 from kivy.uix.button import ButtonBehavior
-from kivy.uix.scrollview import ScrollView
-from kivy.uix.label import Label
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleboxlayout import RecycleBoxLayout
+from kivy.uix.widget import Widget
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
 from kivy.uix.progressbar import ProgressBar
 from kivy.uix.spinner import Spinner, SpinnerOption
 from kivy.clock import Clock
 from kivy.core.window import Window
+from kivy.core.text.markup import MarkupLabel
+from kivy.graphics import Rectangle
 from kivy.properties import BooleanProperty, NumericProperty, ListProperty
 from kivy.animation import Animation
 
-from spotify import SpotifyPlayer
+from spotify import SpotifyPlayer, StartupReport
+from metrics import Metrics
+UI_IMPORT_TIME = time.perf_counter() - STARTED_AT
 
 def calcFontSize(text, width, maxSize, multiplier=2):
     """Calculate a responsive font size based on text length and available width."""
@@ -25,26 +33,132 @@ def calcFontSize(text, width, maxSize, multiplier=2):
         return(maxSize)
     return(min(maxSize, width/len(text)*multiplier))
 
+def weakCallback(callback):
+    """Returns a function returning callback, holding bound methods weakly so registrations never keep widgets alive."""
+    if callback == None:
+        return(lambda: None)
+    if hasattr(callback, "__self__"):
+        return(weakref.WeakMethod(callback))
+    return(lambda: callback)
+
+class HoverDispatcher:
+    """
+    The single Window.mouse_pos handler of every hoverable widget. The window rectangles of the registered widgets
+    are kept in a grid of cellSize pixel cells, rebuilt only when one of them moved, resized or changed parent.
+    Mouse moves are coalesced to at most one dispatch per frame, and each dispatch does one hit test: the widgets
+    in the cell under the mouse are the only ones checked.
+    """
+    def __init__(self, window=Window, cellSize=64):
+        self.cellSize = cellSize
+        self.regions = weakref.WeakKeyDictionary()  #< widget -> {"margin": (horizontal, vertical), "onEnter": weak callback, ...}
+        self.hovered = weakref.WeakSet()
+        self.grid = {}                              #< (column, row) -> [(weakref to widget, x1, y1, x2, y2)]
+        self.dirty = True
+        self.mousePos = None
+        self.stats = {"events": 0, "dispatches": 0, "rebuilds": 0, "checked": 0}
+        self.dispatchTrigger = Clock.create_trigger(self._dispatch)
+        window.bind(mouse_pos=self._on_mouse_pos, size=self.invalidate)
+
+    def register(self, widget, onEnter=None, onLeave=None, onMove=None, margin=(0, 0)) -> None:
+        """
+        Calls onEnter(pos) and onLeave(pos) when the mouse enters or leaves widget (grown by margin=(horizontal, vertical)
+        pixels on each side), and onMove(pos) on every frame the mouse moved while inside it.
+        """
+        self.regions[widget] = {"margin": margin, "onEnter": weakCallback(onEnter), "onLeave": weakCallback(onLeave), "onMove": weakCallback(onMove)}
+        widget.fbind("pos", self.invalidate)
+        widget.fbind("size", self.invalidate)
+        widget.fbind("parent", self.invalidate)
+        self.dirty = True
+
+    def unregister(self, widget) -> None:
+        self.regions.pop(widget, None)
+        self.hovered.discard(widget)
+        self.dirty = True
+
+    def invalidate(self, *args) -> None:
+        """Marks the index stale, it is rebuilt by the next dispatch."""
+        self.dirty = True
+
+    def _on_mouse_pos(self, window, pos):
+        self.stats["events"] += 1
+        self.mousePos = pos
+        self.dispatchTrigger()
+
+    def _rebuild(self) -> None:
+        self.grid = {}
+        unplaced = False
+        cell = self.cellSize
+        for widget, region in list(self.regions.items()):
+            if not widget.get_root_window():
+                unplaced = True  #< Not on screen yet, look again next time (an ancestor being added fires no event here)
+                continue
+            x, y = widget.to_window(*widget.pos)
+            margin = region["margin"]
+            x1, y1 = x - margin[0], y - margin[1]
+            x2, y2 = x + widget.width + margin[0], y + widget.height + margin[1]
+            entry = (weakref.ref(widget), x1, y1, x2, y2)
+            for column in range(int(x1 // cell), int(x2 // cell) + 1):
+                for row in range(int(y1 // cell), int(y2 // cell) + 1):
+                    self.grid.setdefault((column, row), []).append(entry)
+        self.dirty = unplaced
+        self.stats["rebuilds"] += 1
+
+    def _dispatch(self, *args) -> None:
+        if self.mousePos == None:
+            return
+        if self.dirty:
+            self._rebuild()
+        self.stats["dispatches"] += 1
+        x, y = pos = self.mousePos
+        inside = []
+        for ref, x1, y1, x2, y2 in self.grid.get((int(x // self.cellSize), int(y // self.cellSize)), ()):
+            self.stats["checked"] += 1
+            widget = ref()
+            if widget != None and x1 <= x <= x2 and y1 <= y <= y2 and widget in self.regions:
+                inside.append(widget)
+
+        for widget in [widget for widget in self.hovered if widget not in inside]:
+            self.hovered.discard(widget)
+            self._call(widget, "onLeave", pos)
+        for widget in inside:
+            if widget not in self.hovered:
+                self.hovered.add(widget)
+                self._call(widget, "onEnter", pos)
+            self._call(widget, "onMove", pos)
+
+    def _call(self, widget, name, pos) -> None:
+        region = self.regions.get(widget)
+        callback = region[name]() if region != None else None
+        if callback != None:
+            callback(pos)
+
+    def getStats(self) -> dict:
+        """Returns the mouse events received, the dispatches (at most one per frame), index rebuilds and regions checked."""
+        return(dict(self.stats, regions=len(self.regions)))
+
+_hoverDispatcher = None
+
+def getHoverDispatcher() -> HoverDispatcher:
+    """Returns the HoverDispatcher of the window, creating it on first use."""
+    global _hoverDispatcher
+    if _hoverDispatcher == None:
+        _hoverDispatcher = HoverDispatcher()
+    return(_hoverDispatcher)
+
 class HoverBehavior(object):
     hovered = BooleanProperty(False)
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        Window.bind(mouse_pos=self.on_mouse_pos)
+        getHoverDispatcher().register(self, onEnter=self._on_hover_enter, onLeave=self._on_hover_leave)
 
-    def on_mouse_pos(self, *args):
-        if not self.get_root_window():
-            return
+    def _on_hover_enter(self, pos):
+        self.hovered = True
+        self.on_hover()
 
-        pos = args[1]
-        inside = self.collide_point(*self.to_widget(*pos))
-        if self.hovered == inside:
-            return
-        self.hovered = inside
-        if inside:
-            self.on_hover()
-        else:
-            self.on_unhover()
+    def _on_hover_leave(self, pos):
+        self.hovered = False
+        self.on_unhover()
 
     def on_hover(self):
         pass
@@ -75,6 +189,100 @@ class ImageButton(ButtonBehavior, Image, HoverBehavior):
             base_w, base_h = self.texture_size
             self.size = (base_w * value, base_h * value)
 
+class LyricTextureCache:
+    """
+    Bounded LRU cache of rendered lyric line textures, keyed by the line text, width, font size and highlight state.
+    Moving the highlight between lines swaps cached textures instead of laying out and rasterizing the text again.
+    """
+    def __init__(self, maxSize=256, color=(0.9, 0.9, 0.9, 1)):
+        self.maxSize = maxSize
+        self.color = color
+        self.textures = OrderedDict()  #< (line, width, size, highlighted, wordIndex) -> Texture
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, line, width, highlighted=False, words=None, wordIndex=-1):
+        """Returns the texture of line rendered for width (None for an empty line), rendering it on a miss."""
+        maxSize = 30 if highlighted else 24
+        key = (line, width, maxSize, highlighted, wordIndex if words else -1)
+        if key in self.textures:
+            self.textures.move_to_end(key)
+            self.hits += 1
+            return(self.textures[key])
+        self.misses += 1
+        texture = self._render(self._markup(line, highlighted, words, wordIndex), width, calcFontSize(line, width, maxSize))
+        self.textures[key] = texture
+        if len(self.textures) > self.maxSize:
+            self.textures.popitem(last=False)
+        return(texture)
+
+    def _markup(self, line, highlighted, words, wordIndex) -> str:
+        if highlighted and words:
+            sung = "".join(word for _, word in words[:wordIndex + 1])
+            upcoming = "".join(word for _, word in words[wordIndex + 1:])
+            return(f"[b][color=3399FFFF]{sung}[/color]{upcoming}[/b]")
+        if highlighted:
+            return(f"[b][color=3399FFFF]{line}[/color][/b]")
+        return(line)
+
+    def _render(self, markup, width, fontSize):
+        if not markup:
+            return(None)
+        label = MarkupLabel(text=markup, font_size=fontSize, text_size=(width, None), halign="center", color=self.color)
+        label.refresh()
+        return(label.texture)
+
+    def clear(self) -> None:
+        self.textures.clear()
+
+    def getStats(self) -> dict:
+        lookups = self.hits + self.misses
+        return({"size": len(self.textures), "hits": self.hits, "misses": self.misses, "hitRate": self.hits / lookups if lookups else 0.0})
+
+class LyricHighlight:
+    """The highlighted line (and word) of the lyrics view, shared by every LyricLine instead of living in the view data."""
+    __slots__ = ("index", "words", "wordIndex")
+
+    def __init__(self):
+        self.index = -1
+        self.words = None
+        self.wordIndex = -1
+
+class LyricLine(RecycleDataViewBehavior, Widget):
+    """
+    A single lyric line drawing a texture from the LyricTextureCache given in its data,
+    instances are recycled by the lyrics RecycleView. Whether it is highlighted is read from the
+    LyricHighlight in its data, so moving the highlight never changes the view data.
+    """
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.data = None
+        self.textureTrigger = Clock.create_trigger(self._update_texture)  #< Once per frame, after the layout set the width
+        with self.canvas:
+            self.rect = Rectangle(size=(0, 0))
+        self.bind(width=self.textureTrigger, pos=self._place_texture, height=self._place_texture)
+
+    def refresh_view_attrs(self, rv, index, data):
+        self.data = data
+        self.textureTrigger()
+
+    def _update_texture(self, *args):
+        data = self.data
+        if data == None:
+            return
+        highlight = data["highlight"]
+        if data["index"] == highlight.index:
+            texture = data["cache"].get(data["text"], self.width, True, highlight.words, highlight.wordIndex)
+        else:
+            texture = data["cache"].get(data["text"], self.width, False)
+        self.rect.texture = texture
+        self.rect.size = texture.size if texture else (0, 0)
+        self._place_texture()
+
+    def _place_texture(self, *args):
+        width, height = self.rect.size
+        self.rect.pos = (int(self.center_x - width / 2), int(self.center_y - height / 2))
+
 class DropdownOption(SpinnerOption):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -84,30 +292,100 @@ class DropdownOption(SpinnerOption):
         self.size_hint_y = None
         self.height = 50
 
-class Timer:
+class FrameStats:
+    """Counts frames and the time spent rendering them."""
     def __init__(self):
-        self.timeNow = time.time()
-        self.time = 0
-    
-    def setTime(self, setTime):
-        self.time = setTime
-        self.timeNow = time.time()
-    
-    def getTime(self):
-        return(self.time + (time.time() - self.timeNow))
-
-    def __repr__(self):
-        return(self.getTime())
+        self.frames = 0
+        self.totalTime = 0.0
+        self.lastTime = 0.0
+        self.maxTime = 0.0
+
+    def add(self, frameTime):
+        self.frames += 1
+        self.totalTime += frameTime
+        self.lastTime = frameTime
+        self.maxTime = max(self.maxTime, frameTime)
+
+    def getStats(self) -> dict:
+        return({
+            "frames": self.frames,
+            "averageMs": self.totalTime / self.frames * 1000 if self.frames else 0.0,
+            "lastMs": self.lastTime * 1000,
+            "maxMs": self.maxTime * 1000
+        })
+
+class PowerStats:
+    """Time spent, UI timer wakeups and backend polls in each power mode."""
+    def __init__(self, mode, pollCount=lambda: 0, clock=time.monotonic):
+        self.pollCount = pollCount
+        self.clock = clock
+        self.modes = {}
+        self.mode = None
+        self.setMode(mode)
+
+    def setMode(self, mode) -> None:
+        now, polls = self.clock(), self.pollCount()
+        if self.mode != None:
+            stats = self.modes[self.mode]
+            stats["seconds"] += now - self.since
+            stats["polls"] += polls - self.pollsSince
+        self.modes.setdefault(mode, {"seconds": 0.0, "wakeups": 0, "polls": 0})
+        self.mode, self.since, self.pollsSince = mode, now, polls
+
+    def wakeup(self) -> None:
+        self.modes[self.mode]["wakeups"] += 1
+
+    def getStats(self) -> dict:
+        """Returns the seconds, wakeups, polls and wakeups per minute (UI wakeups and polls) of every mode seen so far."""
+        report = {}
+        for mode, stats in self.modes.items():
+            stats = dict(stats)
+            if mode == self.mode:  #< Include the period still running
+                stats["seconds"] += self.clock() - self.since
+                stats["polls"] += self.pollCount() - self.pollsSince
+            minutes = stats["seconds"] / 60
+            stats["wakeupsPerMinute"] = (stats["wakeups"] + stats["polls"]) / minutes if minutes else 0.0
+            report[mode] = stats
+        return(report)
 
 class MiniSpotifyPlayer(BoxLayout):
+    LINE_HEIGHT = 40
+    LINE_BOUNDARY_SLACK = 0.01  #< Fire just after a line starts so the lookup lands on the new line
+    RENDERED_FIELDS = ("connected", "trackId", "isPlaying", "duration", "lyrics", "lyricsPending", "clockState")  #< Snapshot fields shown on screen
     progress = NumericProperty(0)
     lyrics_lines = ListProperty([])
 
-    def __init__(self, imageFolder="./images/", secretsFile="secrets.json", **kwargs):
+    def __init__(self, imageFolder="./images/", secretsFile="secrets.json", progressInterval=1.0, backgroundStartup=True, backend=None,
+                 metricsPort=None, metricsFile=None, wordHighlight=False, idleTimeout=120, idleProgressInterval=5.0, daemonPort=None, **kwargs):
+        """
+        With backgroundStartup the window shows a placeholder while authentication, the first poll and the playlists load.
+        backend is an already created SpotifyPlayer to use instead of creating one from secretsFile.
+        With daemonPort the player is a thin client of the playback daemon on that port (see playbackdaemon.py)
+        instead of polling Spotify itself.
+        metricsPort serves the metrics at http://127.0.0.1:<metricsPort>/metrics and metricsFile rewrites them to
+        that file periodically (JSON if it ends with .json, Prometheus text otherwise). Metrics are off if neither is set.
+        With wordHighlight, lyrics with enhanced LRC word timings are highlighted word by word (karaoke style).
+        After idleTimeout seconds without input to an unfocused window the progress bar is only redrawn every
+        idleProgressInterval seconds, see getPowerMode for the other power saving modes.
+        """
         super().__init__(orientation='vertical', **kwargs)
         self.imageFolder = imageFolder
-        self.backend = SpotifyPlayer(secretsFile=secretsFile)
-        self.backend.startUpdateLoop(updateInterval=2, callback=self._update)
+        self.progressInterval = progressInterval  #< Seconds between progress bar redraws while playing
+        self.idleTimeout = idleTimeout
+        self.idleProgressInterval = idleProgressInterval
+        self.startupReport = StartupReport(startedAt=STARTED_AT)
+        self.startupReport.add("imports", UI_IMPORT_TIME)
+        metrics = Metrics(enabled=metricsPort != None or metricsFile != None)
+        if backend == None and daemonPort != None:
+            from playbackdaemon import RemotePlayer  #< Only the thin client needs it
+            backend = RemotePlayer(port=daemonPort, metrics=metrics)
+        self.backend = backend or SpotifyPlayer(secretsFile=secretsFile, connect=not backgroundStartup, startupReport=self.startupReport, metrics=metrics,
+                                                wordTimings=wordHighlight)
+        self.metrics = self.backend.metrics
+        if metricsPort != None:
+            self.metrics.serve(port=metricsPort)
+        if metricsFile != None:
+            self.metrics.startFileExport(metricsFile)
 
         self.lastPos = (0, 0)
         self.lastMouseMoveTime = time.time()
@@ -116,12 +394,40 @@ class MiniSpotifyPlayer(BoxLayout):
         self.playing = True
 
         self.current_index = 0
-        self.time = Timer()
-        self.playlists = self.backend.getAvailablePlaylists()
+        self.highlightedIndex = -1
+        self.wordHighlight = wordHighlight
+        self.highlightedWord = -1
+        self.shownLyrics = None
+        self.shownLyricsWidth = None
+        self.frameStats = FrameStats()
+        self.textureCache = LyricTextureCache()
+        self.lineHighlight = LyricHighlight()
+        self.lineEvent = None
+        self.progressEvent = None
+        self.publishTime = None
+        self.shownSnapshot = None  #< The playback snapshot the screen was last drawn from
+        self.minimized = False
+        self.focused = True
+        self.lastInteraction = time.monotonic()
+        self.idleEvent = None
+        self.powerMode = "active"
+        self.powerStats = PowerStats(self.powerMode, pollCount=self.backend.getPollCount)
+        self.playlists = self.backend.getAvailablePlaylists()  #< Cached list, the spinner fills in as pages load
 
         self._setup_ui()
-        self.idleCheckEvent = Clock.schedule_interval(self._check_idle, 0.5)
-        self._start_update_loop()
+        self.snapshotTrigger = Clock.create_trigger(self._on_snapshot_changed)  #< Several publishes in one frame redraw once
+        self.backend.addSnapshotListener(self._on_snapshot, fields=self.RENDERED_FIELDS)
+        Clock.schedule_once(lambda dt: self.startupReport.mark("firstFrame"))
+        if backgroundStartup:
+            self.backend.startInBackground(playlistsCallback=self._on_playlists_loaded)
+        else:
+            self.backend.startUpdateLoop()
+            self.backend.loadPlaylists(callback=self._on_playlists_loaded)
+        Window.bind(on_minimize=self._on_minimize, on_restore=self._on_restore, on_hide=self._on_minimize, on_show=self._on_restore,
+                    focus=self._on_focus, on_touch_down=self._on_user_input, on_key_down=self._on_user_input)
+        getHoverDispatcher().register(self, onMove=self._on_user_input)
+        self._schedule_idle_check()
+        self._reschedule()
 
     def _setup_ui(self):
         # Root is FloatLayout to allow floating widgets (like centered controls)
@@ -135,12 +441,15 @@ class MiniSpotifyPlayer(BoxLayout):
             self.bg_rect = Rectangle(pos=self.pos, size=self.size)
         self.bind(pos=self._update_bg_rect, size=self._update_bg_rect)
 
-        # Lyrics scroll view (placed inside root layout, fills most of screen)
-        self.lyrics_box = BoxLayout(orientation='vertical', size_hint_y=None, padding=10)
+        # Lyrics view (placed inside root layout, fills most of screen)
+        # Only the lines near the viewport get a LyricLine widget, they are reused while scrolling
+        self.lyrics_box = RecycleBoxLayout(orientation='vertical', size_hint_y=None, padding=10,
+                                           default_size=(None, self.LINE_HEIGHT), default_size_hint=(1, None))
         self.lyrics_box.bind(minimum_height=self.lyrics_box.setter('height'))
 
-        self.scroll = ScrollView(size_hint=(1, 0.9), pos_hint={'x': 0, 'y': 0.1})
+        self.scroll = RecycleView(size_hint=(1, 0.9), pos_hint={'x': 0, 'y': 0.1})
         self.scroll.add_widget(self.lyrics_box)
+        self.scroll.viewclass = LyricLine  #< Must be set after the layout manager is added
         self.root_layout.add_widget(self.scroll)
 
         # Centered controls container — transparent and floating
@@ -202,38 +511,34 @@ class MiniSpotifyPlayer(BoxLayout):
         self.progress_bar.max = 1
         self.progress_bar.bind(on_touch_down=self._on_progress_touch)
         self.root_layout.add_widget(self.progress_bar)
-        Window.bind(mouse_pos=self._on_mouse_move)
+        getHoverDispatcher().register(self.controls_container, onMove=self._on_controls_mouse_move, onLeave=self._on_controls_leave,
+                                      margin=(50, 80))  #< The margin makes the detection more forgiving
+        Window.bind(size=lambda *args: self.textureCache.clear())  #< Every line is rendered for the new width
 
         self._update_lyrics()
 
-    def _on_mouse_move(self, window, pos):
-        x, y = pos
-        widget_x, widget_y = self.controls_container.to_window(*self.controls_container.pos)
-        width, height = self.controls_container.size
-
-        # Optional margin to make detection more forgiving
-        margin_vertical = 80
-        margin_horizontal = 50
+    def _on_controls_mouse_move(self, pos):
+        """Hover dispatcher callback, the mouse moved inside the controls region."""
+        self.isInsideControlsRegion = True
+        if self.lastPos != tuple(pos):
+            self._show_controls()
+            self.lastMouseMoveTime = time.time()
+        self.lastPos = tuple(pos)
 
-        in_x = widget_x - margin_horizontal <= x <= widget_x + width + margin_horizontal
-        in_y = widget_y - margin_vertical <= y <= widget_y + height + margin_vertical
-
-        if in_x and in_y:
-            self.isInsideControlsRegion = True
-            if self.lastPos != (x, y):
-                self._show_controls()
-                self.lastMouseMoveTime = time.time()
-            self.lastPos = (x, y)
-        else:
-            self.isInsideControlsRegion = False
+    def _on_controls_leave(self, pos):
+        self.isInsideControlsRegion = False
 
     def _check_idle(self, dt):
-        if not self.isInsideControlsRegion:
-            self._hide_controls()
-        elif time.time() - self.lastMouseMoveTime > 1:
+        self._count_wakeup()
+        if not self.isInsideControlsRegion or time.time() - self.lastMouseMoveTime > 1:
             self._hide_controls()
+            if self.controls_container.opacity == 0:
+                self.idleCheckEvent.cancel()  #< Nothing left to hide, _show_controls starts it again
+                self.idleCheckEvent = None
 
     def _show_controls(self):
+        if self.idleCheckEvent == None:
+            self.idleCheckEvent = Clock.schedule_interval(self._check_idle, 0.5)
         if self.controls_container.opacity == 0:
             Animation.cancel_all(self.controls_container)
             Animation(opacity=1, d=0.25).start(self.controls_container)
@@ -252,67 +557,280 @@ class MiniSpotifyPlayer(BoxLayout):
         self.playing = not self.playing
         self.play_btn.source = os.path.join(self.imageFolder, "pause.png") if self.playing else os.path.join(self.imageFolder, "play.png")
 
+    def _on_playlists_loaded(self, playlists):
+        """Catalog callback, runs on the playlist loading thread."""
+        Clock.schedule_once(lambda dt: self._set_playlists(playlists))
+
+    def _set_playlists(self, playlists):
+        self.playlists = playlists
+        playlist_names = [pl["name"] for pl in playlists]
+        self.playlist_spinner.values = playlist_names
+        if playlist_names and not self.playlist_spinner.text:
+            self.playlist_spinner.text = "Add To Playlist"
+
     def _add_to_selected_playlist(self, spinner, playlist_name):
-        selected = next((pl for pl in self.playlists if pl["name"] == playlist_name), None)
+        selected = self.backend.getPlaylistByName(playlist_name)
         if selected:
             self.backend.addToPlaylist(selected["id"])
 
-    def _start_update_loop(self):
-        def loop():
-            while True:
-                time.sleep(0.1)
-                Clock.schedule_once(lambda dt: self._update_lyrics())
-                Clock.schedule_once(lambda dt: self._update_progress())
-
-        threading.Thread(target=loop, daemon=True).start()
-    
-    def _update(self, *args):
-        self.time.setTime(self.backend.getCurrentTime())
-        self.playing = self.backend.isPlaying()
-        Clock.schedule_once(lambda dt: self._update_lyrics())
-        Clock.schedule_once(lambda dt: self._update_progress())
-        Clock.schedule_once(lambda dt: self._updatePlayPauseButton())
-    
-    def _update_lyrics(self, *args):
-        lyrics = self.backend.getLyrics().splitlines()
-        # if lyrics != [lbl.text for lbl in self.lyrics_box.children[::-1]]:
-        self.lyrics_box.clear_widgets()
-        for line in lyrics:
-            lbl = Label(
-                text=line,
-                halign='center',
-                markup=True,
-                size_hint_y=None,
-                height=40,
-                font_size=calcFontSize(line, self.width, 24),
-                color=(0.9, 0.9, 0.9, 1)
-            )
-            lbl.bind(size=lambda inst, val: inst.setter('text_size')(inst, (inst.width, None)))
-            self.lyrics_box.add_widget(lbl)
-        self.lyrics_lines = self.lyrics_box.children[::-1]
-        if self.backend.isSynced() and self.backend.isPlaying():
-            self._update_lyrics_highlight()
-
-    def _update_lyrics_highlight(self, *args):
-        self.current_index = self.backend.getCurrentLyricIndex(at=self.time.getTime())
-        lyrics_lines_text = self.backend.getLyrics().splitlines()
-        for i, lbl in enumerate(self.lyrics_lines):
-            line = lyrics_lines_text[i]
-            if i == self.current_index:
-                lbl.text = f"[b][color=3399FFFF]{line}[/color][/b]"
-                lbl.font_size=calcFontSize(line, self.width, 30)
-            else:
-                lbl.text = line
-                lbl.font_size=calcFontSize(line, self.width, 24)
-
-        # Delay the scroll adjustment to next frame so layout has been updated
-        Clock.schedule_once(self._center_current_line, 0)
+    def getPowerMode(self) -> str:
+        """
+        Returns the power mode: "hidden" while the window is minimized (no redraws, the backend polls in the background),
+        "paused" while the music is paused (no redraws or timers until something changes, the backend polls slowly), "idle"
+        when playing in an unfocused window nobody touched for idleTimeout seconds (slower progress bar and polling, the
+        lyric lines still move since the window is read without focus) and "active" otherwise.
+        """
+        return(self.powerMode)
+
+    def getPowerStats(self) -> dict:
+        """Returns the seconds, UI timer wakeups, polls and wakeups per minute spent in each power mode."""
+        return(self.powerStats.getStats())
+
+    def _update_power_mode(self, snapshot=None):
+        snapshot = snapshot or self.backend.getSnapshot()
+        if self.minimized:
+            mode = "hidden"
+        elif not snapshot.isPlaying:
+            mode = "paused"
+        elif not self.focused and time.monotonic() - self.lastInteraction >= self.idleTimeout:
+            mode = "idle"
+        else:
+            mode = "active"
+        if mode == self.powerMode:
+            return
+        wasHidden = self.powerMode == "hidden"
+        wasIdle = self.powerMode == "idle"
+        self.powerMode = mode
+        self.powerStats.setMode(mode)
+        self._schedule_idle_check()
+        if mode == "idle" or wasIdle:
+            self.backend.setUnattended(mode == "idle")
+        if mode == "hidden":
+            self.backend.setBackground(True)
+            self._cancel_redraws()
+        elif wasHidden:
+            self.backend.setBackground(False)  #< Polls right away, the snapshot listener redraws
+            self._reschedule()
+            self._updatePlayPauseButton()
+        else:
+            self._schedule_progress(snapshot, restart=True)  #< The progress bar rate depends on the mode
+
+    def _count_wakeup(self):
+        """Called by every timer callback of the UI."""
+        self.powerStats.wakeup()
+        self.metrics.increment("ui_wakeups_total", mode=self.powerMode)
+
+    def _cancel_redraws(self):
+        for event in (self.lineEvent, self.progressEvent):
+            if event:
+                event.cancel()
+        self.lineEvent = self.progressEvent = None
+
+    def _on_minimize(self, *args):
+        self.minimized = True
+        self._update_power_mode()
+
+    def _on_restore(self, *args):
+        self.minimized = False
+        self._on_user_input()
+
+    def _on_focus(self, window, focused):
+        self.focused = focused
+        self._on_user_input()
+
+    def _on_user_input(self, *args):
+        """Any mouse move, touch, key press or focus change leaves the idle mode right away."""
+        self.lastInteraction = time.monotonic()
+        if self.powerMode == "idle" or (self.powerMode == "hidden" and not self.minimized):
+            self._update_power_mode()
+        self._schedule_idle_check()
+
+    def _schedule_idle_check(self):
+        """
+        Arms a single check for when the window would become idle. Only the active mode of an unfocused window can turn
+        idle, so the other modes run no idle timer and input, focus changes and leaving them re-arm it.
+        """
+        if self.idleEvent != None or self.powerMode != "active" or self.focused:
+            return  #< A pending check reschedules itself when input moved the deadline
+        delay = max(0.0, self.lastInteraction + self.idleTimeout - time.monotonic())
+        self.idleEvent = Clock.schedule_once(self._check_user_idle, delay)
+
+    def _check_user_idle(self, dt):
+        """Fires once per idleTimeout instead of polling the input time."""
+        self.idleEvent = None
+        self._count_wakeup()
+        self._update_power_mode()
+        self._schedule_idle_check()
+
+    def _on_snapshot(self, snapshot, changed):
+        """Snapshot listener, runs on the backend thread that published a change of one of RENDERED_FIELDS."""
+        self.publishTime = time.perf_counter()
+        self.snapshotTrigger()
+
+    def _on_snapshot_changed(self, *args):
+        snapshot = self.backend.getSnapshot()  #< Read once, the whole frame is drawn from it
+        if self.metrics.enabled and self.publishTime != None:
+            self.metrics.observe("ui_poll_dispatch_seconds", time.perf_counter() - self.publishTime)
+        self._count_wakeup()
+        changed = snapshot.getChanges(self.shownSnapshot)
+        self._update_power_mode(snapshot)
+        if self.powerMode == "hidden":
+            return  #< Drawn from the latest snapshot once the window is shown again
+        self._reschedule(snapshot)
+        if "isPlaying" in changed:
+            self._updatePlayPauseButton(snapshot)
+
+    def _reschedule(self, snapshot=None):
+        """
+        Redraws the lyrics and progress, then schedules a single Clock event for the start of the next lyric line.
+        Called on song change, seek and every poll correction.
+        """
+        snapshot = snapshot or self.backend.getSnapshot()
+        self.shownSnapshot = snapshot
+        self._update_lyrics(snapshot)
+        self._update_progress(snapshot)
+        self._schedule_next_line(snapshot)
+        self._schedule_progress(snapshot)
+
+    def _schedule_next_line(self, snapshot):
+        if self.lineEvent:
+            self.lineEvent.cancel()
+            self.lineEvent = None
+
+        lyrics = snapshot.lyrics
+        if not lyrics or not lyrics.isSynced() or not snapshot.isPlaying or self.powerMode == "hidden":
+            return  #< Nothing will change until the next poll
+
+        now = snapshot.getPosition()
+        index = lyrics.getIndex(now)
+        nextTime = lyrics.getTimestamp(index + 1) if index + 1 < lyrics.getLineCount() else None
+        words = lyrics.getWords(index) if self.wordHighlight else None
+        if words:
+            wordIndex = lyrics.getWordIndex(index, now)
+            if wordIndex + 1 < len(words):
+                nextTime = min(nextTime, words[wordIndex + 1][0]) if nextTime != None else words[wordIndex + 1][0]
+        if nextTime == None:
+            return
+        delay = nextTime - now
+        self.lineEvent = Clock.schedule_once(self._on_line_boundary, max(0, delay) + self.LINE_BOUNDARY_SLACK)
+
+    def _on_line_boundary(self, dt):
+        self.lineEvent = None
+        self._count_wakeup()
+        snapshot = self.backend.getSnapshot()
+        self._update_lyrics(snapshot)
+        self._schedule_next_line(snapshot)
+
+    def _schedule_progress(self, snapshot, restart=False):
+        """Keeps the low rate progress bar interval running only while music is playing (even slower when idle)."""
+        playing = snapshot.isPlaying and self.powerMode != "hidden"
+        if restart and self.progressEvent:
+            self.progressEvent.cancel()
+            self.progressEvent = None
+        if playing and not self.progressEvent:
+            interval = self.idleProgressInterval if self.powerMode == "idle" else self.progressInterval
+            self.progressEvent = Clock.schedule_interval(self._on_progress_tick, interval)
+        elif not playing and self.progressEvent:
+            self.progressEvent.cancel()
+            self.progressEvent = None
+
+    def _update_lyrics(self, snapshot=None):
+        start = time.perf_counter()
+        snapshot = snapshot or self.backend.getSnapshot()
+        lyrics = snapshot.lyrics
+        shown = lyrics or snapshot.getLyricsText()  #< Placeholder text until there are lyrics
+        if shown != self.shownLyrics or self.width != self.shownLyricsWidth:
+            self._build_lyrics(snapshot)
+
+        if snapshot.isSynced() and snapshot.isPlaying:
+            self._update_lyrics_highlight(snapshot)
+        else:
+            self._set_highlighted_line(-1)
+        frameTime = time.perf_counter() - start
+        self.frameStats.add(frameTime)
+        if self.metrics.enabled:
+            self.metrics.observe("ui_update_lyrics_seconds", frameTime)
+            self.metrics.setGauge("ui_clock_events", len(Clock.get_events()))
+
+    def _build_lyrics(self, snapshot):
+        """Fills the lyrics view for a new song, this is the only place the whole view data is replaced."""
+        lyrics = snapshot.lyrics
+        text = snapshot.getLyricsText()
+        self.shownLyrics = lyrics or text
+        self.shownLyricsWidth = self.width
+        self.highlightedIndex = self.lineHighlight.index = -1
+        self.highlightedWord = self.lineHighlight.wordIndex = -1
+        self.lineHighlight.words = None
+        if lyrics and lyrics.isSynced():
+            self.lyrics_lines = lyrics.lines
+        else:
+            self.lyrics_lines = text.splitlines()  #< Unsynced lyrics are one text blob
+        self.scroll.data = [{"text": line, "index": index, "highlight": self.lineHighlight, "cache": self.textureCache}
+                            for index, line in enumerate(self.lyrics_lines)]
+
+    def _prerender_line(self, index):
+        """Renders the highlighted texture of a line ahead of time, so reaching it only swaps textures."""
+        if 0 <= index < len(self.lyrics_lines):
+            padding = self.lyrics_box.padding
+            self.textureCache.get(self.lyrics_lines[index], self.lyrics_box.width - padding[0] - padding[2], highlighted=True)
+
+    def _update_lyrics_highlight(self, snapshot=None):
+        snapshot = snapshot or self.backend.getSnapshot()
+        now = snapshot.getPosition()
+        self.current_index = snapshot.getLyricIndex(at=now)
+        if self.wordHighlight:
+            lyrics = snapshot.lyrics
+            wordIndex = lyrics.getWordIndex(self.current_index, now) if lyrics else -1
+            if wordIndex != self.highlightedWord and self.current_index == self.highlightedIndex:
+                self.highlightedWord = self.lineHighlight.wordIndex = wordIndex
+                self._refresh_line(self.current_index)  #< Only the active word moved
+                return
+            self.highlightedWord = wordIndex
+        if self._set_highlighted_line(self.current_index, snapshot.lyrics):
+            # Delay the scroll adjustment to next frame so layout has been updated
+            Clock.schedule_once(self._center_current_line, 0)
+
+    def _set_highlighted_line(self, index, lyrics=None) -> bool:
+        """Moves the highlight to index (-1 for none), only the old and new lines are redrawn."""
+        if index == self.highlightedIndex:
+            return(False)
+        previous = self.highlightedIndex
+        self.highlightedIndex = self.lineHighlight.index = index
+        self.lineHighlight.wordIndex = self.highlightedWord
+        self.lineHighlight.words = None
+        if index >= 0 and self.wordHighlight and lyrics:
+            self.lineHighlight.words = lyrics.getWords(index)
+        self._refresh_line(previous)
+        self._refresh_line(index)
+        if index >= 0 and not self.wordHighlight:  #< Word by word lines get a new texture per word anyway
+            Clock.schedule_once(lambda dt: self._prerender_line(index + 1))
+        return(True)
+
+    def _refresh_line(self, index):
+        """Redraws the line at index if it is on screen, lines scrolled into view later read the highlight themselves."""
+        if index < 0:
+            return
+        view = self.scroll.view_adapter.get_visible_view(index)  #< Changing scroll.data would lay out every line again
+        if view != None:
+            view.textureTrigger()
+
+    def getFrameStats(self) -> dict:
+        """Returns the frame time statistics of _update_lyrics."""
+        return(self.frameStats.getStats())
+
+    def getHoverStats(self) -> dict:
+        """Returns the counters of the window's hover dispatcher."""
+        return(getHoverDispatcher().getStats())
+
+    def getTextureCacheStats(self) -> dict:
+        """Returns the size and hit rate of the lyric texture cache."""
+        return(self.textureCache.getStats())
 
     def _center_current_line(self, dt):
         if not self.lyrics_lines or self.current_index >= len(self.lyrics_lines):
             return
 
-        line_height = self.lyrics_lines[0].height if self.lyrics_lines else 40
+        line_height = self.LINE_HEIGHT
         index = self.current_index
         content_height = self.lyrics_box.height
         viewport_height = self.scroll.height
@@ -329,11 +847,16 @@ class MiniSpotifyPlayer(BoxLayout):
 
         self.scroll.scroll_y = 1 - scroll_y
 
-    def _update_progress(self, *args):
-        if not self.backend.getSongDuration():
+    def _on_progress_tick(self, dt):
+        self._count_wakeup()
+        self._update_progress()
+
+    def _update_progress(self, snapshot=None):
+        snapshot = snapshot or self.backend.getSnapshot()
+        if not snapshot.duration:
             progress = 0.0
         else:
-            progress = min(1, self.time.getTime()/self.backend.getSongDuration())
+            progress = min(1, snapshot.getPosition()/snapshot.duration)
         self.progress = progress
         self.progress_bar.value = progress
 
@@ -341,25 +864,36 @@ class MiniSpotifyPlayer(BoxLayout):
         if instance.collide_point(*touch.pos):
             width = instance.width
             clicked_ratio = touch.x / width
-            self.backend.seekToPercent(clicked_ratio)
+            self.backend.seekToPercent(clicked_ratio)  #< Publishes the new position, the snapshot listener redraws
 
-    def _updatePlayPauseButton(self, *args):
-        if self.backend.isPlaying():
+    def _updatePlayPauseButton(self, snapshot=None):
+        self.playing = (snapshot or self.backend.getSnapshot()).isPlaying
+        if self.playing:
             self.play_btn.source = os.path.join(self.imageFolder, "pause.png")
         else:
             self.play_btn.source = os.path.join(self.imageFolder, "play.png")
 
 class MiniSpotifyApp(App):
-    def __init__(self, size=(300,300), imageFolder="./images/", secretsFile="secrets.json", title="Mini Spotify Player", **kwargs):
+    def __init__(self, size=(300,300), imageFolder="./images/", secretsFile="secrets.json", title="Mini Spotify Player", progressInterval=1.0, backgroundStartup=True,
+                 metricsPort=None, metricsFile=None, wordHighlight=False, idleTimeout=120, daemonPort=None, **kwargs):
         Window.size = size
         super().__init__(**kwargs)
         self.title = title
         self.imageFolder = imageFolder
         self.secretsFile = secretsFile
+        self.progressInterval = progressInterval
+        self.backgroundStartup = backgroundStartup
+        self.metricsPort = metricsPort
+        self.metricsFile = metricsFile
+        self.wordHighlight = wordHighlight
+        self.idleTimeout = idleTimeout
+        self.daemonPort = daemonPort
 
     def build(self):
         Window.always_on_top = True  #< This keeps the window on top
-        return(MiniSpotifyPlayer(imageFolder=self.imageFolder, secretsFile=self.secretsFile))
+        return(MiniSpotifyPlayer(imageFolder=self.imageFolder, secretsFile=self.secretsFile, progressInterval=self.progressInterval,
+                                 backgroundStartup=self.backgroundStartup, metricsPort=self.metricsPort, metricsFile=self.metricsFile,
+                                 wordHighlight=self.wordHighlight, idleTimeout=self.idleTimeout, daemonPort=self.daemonPort))
 
 if __name__ == "__main__":
     MiniSpotifyApp(secretsFile="secrets.json").run()
@@ -0,0 +1,225 @@
+import os
+import json
+import time
+import threading
+from bisect import bisect_left
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+DESCRIPTIONS = {
+    "spotify_request_seconds": "Latency of Spotify requests by endpoint, without the request budget wait.",
+    "spotify_request_errors_total": "Failed Spotify requests by endpoint and HTTP status.",
+    "spotify_budget_wait_seconds": "Time spent waiting for the request budget by priority.",
+    "lyrics_lookup_seconds": "Latency of lyrics lookups by source (the cache or a provider name).",
+    "update_poll_seconds": "Duration of one poll of the update loop.",
+    "playback_clock_error_seconds": "Difference between the polled and the extrapolated playback position.",
+    "update_loop_lag_seconds": "How late the update loop woke up compared to its polling interval.",
+    "ui_update_lyrics_seconds": "Frame time of the lyrics view update.",
+    "ui_poll_dispatch_seconds": "Delay between a playback snapshot being published and the UI drawing it on the Kivy thread.",
+    "ui_clock_events": "Events scheduled on the Kivy Clock.",
+    "ui_wakeups_total": "Timer callbacks run by the UI, by power mode.",
+}
+
+class Histogram:
+    """Cumulative bucket counts, the sum and the count of the observed values."""
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  #< The last slot counts values above the largest bucket
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def getQuantile(self, q) -> float:
+        """Returns the upper bound of the bucket holding the q quantile (inf if it is above every bucket)."""
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank and seen > 0:
+                return(bound)
+        return(float("inf"))
+
+    def getStats(self) -> dict:
+        return({
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else 0.0,
+            "p50": self.getQuantile(0.5),
+            "p99": self.getQuantile(0.99)
+        })
+
+class _Timer:
+    __slots__ = ("metrics", "name", "labels", "start")
+
+    def __init__(self, metrics, name, labels):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return(self)
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, time.perf_counter() - self.start, **self.labels)
+        return(False)
+
+class _NullTimer:
+    """Returned by a disabled Metrics.measure, does nothing."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return(self)
+
+    def __exit__(self, *exc):
+        return(False)
+
+NULL_TIMER = _NullTimer()
+
+def makeKey(name, labels) -> tuple:
+    """Metrics are stored under their name and sorted labels, with every label value as a string."""
+    return((name, tuple(sorted((key, str(value)) for key, value in labels.items()))))
+
+def formatLabels(labels, extra=()) -> str:
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return("")
+    escape = lambda value: str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+    return("{" + ",".join(f'{key}="{escape(value)}"' for key, value in pairs) + "}")
+
+def formatNumber(value) -> str:
+    if value == float("inf"):
+        return("+Inf")
+    return(repr(float(value)) if isinstance(value, float) else str(value))
+
+class Metrics:
+    """
+    Histograms, counters and gauges keyed by name and labels, exported in the Prometheus text format.
+    A disabled Metrics (the default everywhere) returns right away from every call, so instrumented code
+    costs an attribute check when nobody is looking.
+    """
+    def __init__(self, enabled=False, buckets=LATENCY_BUCKETS):
+        self.enabled = enabled
+        self.buckets = buckets
+        self._histograms = {}  #< (name, ((label, value), ...)) -> Histogram
+        self._counters = {}
+        self._gauges = {}
+        self._lock = threading.Lock()
+        self._server = None
+
+    def observe(self, name, value, **labels) -> None:
+        """Adds value (in seconds for latencies) to the histogram name."""
+        if not self.enabled:
+            return
+        key = makeKey(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram == None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def measure(self, name, **labels):
+        """Context manager adding the time spent in the with block to the histogram name."""
+        if not self.enabled:
+            return(NULL_TIMER)
+        return(_Timer(self, name, labels))
+
+    def increment(self, name, amount=1, **labels) -> None:
+        if not self.enabled:
+            return
+        key = makeKey(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def setGauge(self, name, value, **labels) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._gauges[makeKey(name, labels)] = value
+
+    def getSnapshot(self) -> dict:
+        """Returns every metric as {name: {labels: value or histogram stats}}."""
+        snapshot = {}
+        with self._lock:
+            for (name, labels), histogram in self._histograms.items():
+                snapshot.setdefault(name, {})[formatLabels(labels)] = histogram.getStats()
+            for store in (self._counters, self._gauges):
+                for (name, labels), value in store.items():
+                    snapshot.setdefault(name, {})[formatLabels(labels)] = value
+        return(snapshot)
+
+    def toPrometheus(self) -> str:
+        """Returns every metric in the Prometheus text exposition format."""
+        lines = []
+        def header(name, kind, seen):
+            if name not in seen:
+                seen.add(name)
+                if name in DESCRIPTIONS:
+                    lines.append(f"# HELP {name} {DESCRIPTIONS[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            seen = set()
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                header(name, "histogram", seen)
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), histogram.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{formatLabels(labels, [('le', formatNumber(bound))])} {cumulative}")
+                lines.append(f"{name}_sum{formatLabels(labels)} {formatNumber(histogram.sum)}")
+                lines.append(f"{name}_count{formatLabels(labels)} {histogram.count}")
+            for kind, store in (("counter", self._counters), ("gauge", self._gauges)):
+                for (name, labels), value in sorted(store.items()):
+                    header(name, kind, seen)
+                    lines.append(f"{name}{formatLabels(labels)} {formatNumber(value)}")
+        return("\n".join(lines) + "\n")
+
+    def writeFile(self, path) -> None:
+        """Writes the metrics to path, as JSON if it ends with .json and in the Prometheus text format otherwise."""
+        text = json.dumps(self.getSnapshot(), indent=2) if path.endswith(".json") else self.toPrometheus()
+        tmpFile = path + ".tmp"
+        with open(tmpFile, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmpFile, path)  #< Scrapers never see a half written file
+
+    def startFileExport(self, path, interval=15.0) -> None:
+        """Rewrites path every interval seconds on a background thread."""
+        def export():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.writeFile(path)
+                except OSError as e:
+                    print(f"Failed to export metrics to {path}: {e}")
+
+        threading.Thread(target=export, daemon=True).start()
+
+    def serve(self, port=9464, host="127.0.0.1"):
+        """Serves the metrics in the Prometheus text format at http://host:port/metrics, returns the server."""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = metrics.toPrometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass  #< Keep scrapes out of the console
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return(self._server)
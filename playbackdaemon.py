@@ -0,0 +1,493 @@
+"""
+Shared playback daemon: one headless SpotifyPlayer polls Spotify, looks the lyrics up and runs the actions for every
+player frontend on the machine, so the API load stays the same however many frontends are attached.
+
+    python playbackdaemon.py [--secrets secrets.json] [--port 47815] [--metrics-port 9464]
+
+Frontends connect as thin clients with RemotePlayer, e.g. MiniSpotifyApp(daemonPort=47815).
+
+The protocol is compact JSON, one object per line, over a TCP connection to 127.0.0.1:
+    daemon -> client
+        {"op":"snap","v":12,"f":{"isPlaying":false,"clockState":[...]}}  snapshot fields that changed (all on connect)
+        {"op":"playlists","items":[...]}                                 the user's playlists, on connect and on changes
+        {"op":"reply","id":3,"result":true}                              result (or "error") of a call with an id
+    client -> daemon
+        {"op":"sub","fields":["lyrics","isPlaying"]}                     only receive these snapshot fields (all by default)
+        {"op":"call","name":"seekTo","args":[42.0],"id":3}               runs one of PlaybackDaemon.COMMANDS
+Lyrics travel as their LRC source ({"lrc": text}, null while there are none) and the playback clock state with its
+times relative to sending, so every client extrapolates the position on its own clock.
+"""
+import json
+import time
+import queue
+import socket
+import argparse
+import threading
+from collections import Counter
+
+from spotify import SpotifyPlayer, PlaybackSnapshot, PlaybackClock, SnapshotPublisher, Lyrics
+from metrics import Metrics
+from playlists import PlaylistCatalog
+
+DEFAULT_PORT = 47815
+
+def encodeMessage(message) -> bytes:
+    return((json.dumps(message, separators=(",", ":")) + "\n").encode("utf-8"))
+
+def encodeFields(snapshot, fields, playbackClock) -> dict:
+    """Returns {field: JSON text} for the given snapshot fields, encoded once however many clients get them."""
+    encoded = {}
+    for name in fields:
+        value = getattr(snapshot, name)
+        if name == "lyrics":
+            value = {"lrc": value.source} if value != None else None
+        elif name == "clockState":
+            value = playbackClock.encodeState(value)
+        encoded[name] = json.dumps(value, separators=(",", ":"))
+    return(encoded)
+
+def decodeFields(fields, playbackClock) -> dict:
+    """Turns the fields of a snap message back into PlaybackSnapshot values, on the receiving clock."""
+    changes = {}
+    for name, value in fields.items():
+        if name not in PlaybackSnapshot.FIELDS:
+            continue  #< Sent by a newer daemon
+        if name == "lyrics":
+            value = Lyrics(value["lrc"]) if value != None else None
+        elif name == "clockState":
+            value = playbackClock.decodeState(value)
+        changes[name] = value
+    return(changes)
+
+def formatSnapshot(version, encoded, fields) -> bytes:
+    body = ",".join(f'"{name}":{text}' for name, text in encoded.items() if name in fields)
+    return(f'{{"op":"snap","v":{version},"f":{{{body}}}}}\n'.encode("utf-8"))
+
+class DaemonClient:
+    """A connected frontend, with its own send queue and writer thread so a slow one never holds up the others."""
+    def __init__(self, daemon, sock, address, maxQueued=256):
+        self.daemon = daemon
+        self.sock = sock
+        self.address = address
+        self.fields = frozenset(PlaybackSnapshot.FIELDS)  #< Subscribed snapshot fields
+        self.background = False
+        self.unattended = False
+        self.closed = False
+        self._queue = queue.Queue(maxQueued)
+
+    def start(self) -> None:
+        threading.Thread(target=self._write, daemon=True).start()
+        threading.Thread(target=self._read, daemon=True).start()
+
+    def send(self, data) -> bool:
+        """
+        Queues data without blocking, returns False once the client fell maxQueued messages behind.
+        The caller drops it then with PlaybackDaemon.drop, after releasing the daemon lock (closing takes it).
+        """
+        if self.closed:
+            return(True)
+        try:
+            self._queue.put_nowait(data)
+            return(True)
+        except queue.Full:
+            return(False)
+
+    def _write(self) -> None:
+        while True:
+            data = self._queue.get()
+            if data == None:
+                break
+            try:
+                self.sock.sendall(data)
+            except OSError:
+                break
+        self.close()
+
+    def _read(self) -> None:
+        try:
+            for line in self.sock.makefile("rb"):
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    message = None
+                if not isinstance(message, dict):
+                    print(f"Ignoring a malformed message from playback client {self.address}.")
+                    continue
+                self.daemon.handle(self, message)
+        except OSError:
+            pass
+        finally:
+            self.close()  #< Also when handling a message failed, so the daemon never keeps a client nobody reads for
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self._queue.put_nowait(None)  #< Stops the writer
+        except queue.Full:
+            pass
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+        self.daemon.remove(self)
+
+class PlaybackDaemon:
+    """
+    Serves the snapshots of one SpotifyPlayer to every connected RemotePlayer and runs their commands on it.
+    Changes are sent as deltas against the last snapshot sent, computed under one lock, so every client sees them
+    in order and a burst of publishes is coalesced. The player polls in the background while no client is in the foreground,
+    and unattended while none of them is interacted with.
+    """
+    COMMANDS = ("next", "previous", "pausePlay", "likeCurrentSong", "addToPlaylist", "seekTo", "seekToPercent", "setBackground", "setUnattended")
+
+    def __init__(self, player:SpotifyPlayer, host="127.0.0.1", port=DEFAULT_PORT, maxQueued=256):
+        self.player = player
+        self.host = host
+        self.port = port
+        self.maxQueued = maxQueued  #< Messages a client may fall behind before it is dropped
+        self.clients = []
+        self.sentSnapshot = None
+        self.playlistsMessage = encodeMessage({"op": "playlists", "items": player.getAvailablePlaylists()})
+        self.stats = Counter()
+        self._lock = threading.Lock()
+        self._server = None
+
+    def start(self) -> None:
+        """Starts listening and starts the player in the background, returns right away."""
+        self._server = socket.create_server((self.host, self.port))
+        self.port = self._server.getsockname()[1]  #< The port the OS picked when port is 0
+        self.player.addSnapshotListener(self._on_snapshot)
+        self.player.setBackground(True)  #< Nobody watches until a client connects
+        self.player.startInBackground(playlistsCallback=self._on_playlists)
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def serveForever(self) -> None:
+        self.start()
+        while True:
+            time.sleep(3600)
+
+    def stop(self) -> None:
+        if self._server != None:
+            try:
+                self._server.shutdown(socket.SHUT_RDWR)  #< Wakes the accept thread up
+            except OSError:
+                pass
+            self._server.close()
+        for client in list(self.clients):
+            client.close()
+
+    def _accept(self) -> None:
+        while True:
+            try:
+                sock, address = self._server.accept()
+            except OSError:
+                return  #< Stopped
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            client = DaemonClient(self, sock, address, self.maxQueued)
+            with self._lock:
+                if self.sentSnapshot == None:
+                    self.sentSnapshot = self.player.getSnapshot()
+                snapshot = self.sentSnapshot  #< Deltas of anything newer follow, in order
+                welcome = formatSnapshot(snapshot.version, encodeFields(snapshot, PlaybackSnapshot.FIELDS, self.player.playbackClock), client.fields)
+                queued = client.send(welcome) and client.send(self.playlistsMessage)
+                self.clients.append(client)
+                self.stats["connections"] += 1
+            client.start()
+            if not queued:
+                self.drop([client])  #< maxQueued is too small for even the first messages
+            self._updateBackground()
+
+    def remove(self, client) -> None:
+        with self._lock:
+            if client in self.clients:
+                self.clients.remove(client)
+        self._updateBackground()
+
+    def handle(self, client, message) -> None:
+        """Runs a message of client, on its reader thread."""
+        op = message.get("op")
+        if op == "sub":
+            fields = message.get("fields")
+            if fields != None and not (isinstance(fields, list) and all(isinstance(field, str) for field in fields)):
+                print(f"Ignoring a malformed subscription from playback client {client.address}.")
+                return
+            client.fields = frozenset(fields or PlaybackSnapshot.FIELDS).intersection(PlaybackSnapshot.FIELDS)
+            return
+        if op != "call":
+            return
+        name, args, reply = message.get("name"), message.get("args", []), {"op": "reply", "id": message.get("id")}
+        self.stats["commands"] += 1
+        if not isinstance(name, str) or not isinstance(args, list):
+            reply["error"] = "Malformed command"
+        elif name not in self.COMMANDS:
+            reply["error"] = f"Unknown command {name}"
+        elif name in ("setBackground", "setUnattended"):
+            setattr(client, "background" if name == "setBackground" else "unattended", bool(args and args[0]))
+            self._updateBackground()
+            reply["result"] = True
+        else:
+            try:
+                reply["result"] = getattr(self.player, name)(*args)
+            except Exception as e:
+                print(f"Playback command {name} failed: {e}")
+                reply["error"] = str(e)
+        if reply["id"] != None and not client.send(encodeMessage(reply)):
+            self.drop([client])
+
+    def drop(self, clients) -> None:
+        """Disconnects clients that stopped reading their messages, must be called without _lock held."""
+        for client in clients:
+            print(f"Dropping playback client {client.address}, it is not reading its messages.")
+            self.stats["dropped"] += 1
+            client.close()
+
+    def _updateBackground(self) -> None:
+        with self._lock:
+            background = all(client.background for client in self.clients)
+            unattended = all(client.background or client.unattended for client in self.clients)
+        self.player.setBackground(background)
+        self.player.setUnattended(unattended)
+
+    def _on_snapshot(self, snapshot, changed) -> None:
+        with self._lock:
+            latest = self.player.getSnapshot()  #< Listeners of concurrent publishes may run out of order
+            changed = latest.getChanges(self.sentSnapshot)
+            if not changed:
+                return
+            self.sentSnapshot = latest
+            encoded = encodeFields(latest, changed, self.player.playbackClock)
+            messages = {}  #< One message per distinct subscription
+            dropped = []
+            for client in self.clients:
+                if client.fields.isdisjoint(changed):
+                    continue
+                if client.fields not in messages:
+                    messages[client.fields] = formatSnapshot(latest.version, encoded, client.fields)
+                if not client.send(messages[client.fields]):
+                    dropped.append(client)
+            self.stats["snapshots"] += 1
+        self.drop(dropped)
+
+    def _on_playlists(self, playlists) -> None:
+        message = encodeMessage({"op": "playlists", "items": playlists})
+        with self._lock:
+            self.playlistsMessage = message
+            dropped = [client for client in self.clients if not client.send(message)]
+        self.drop(dropped)
+
+    def getStats(self) -> dict:
+        """Returns the connected clients, connections made, snapshot deltas published and commands run."""
+        with self._lock:
+            return(dict(self.stats, clients=len(self.clients)))
+
+class RemotePlayer:
+    """
+    Thin client of a PlaybackDaemon, with the parts of the SpotifyPlayer interface the UI uses: snapshots and their
+    listeners, the playlists and the playback commands. It never talks to Spotify itself and reconnects when the
+    daemon restarts, the snapshot shows connected=False meanwhile.
+    """
+    def __init__(self, host="127.0.0.1", port=DEFAULT_PORT, fields=None, metrics:Metrics=None, reconnectDelay=2.0, clock=time.monotonic):
+        """fields subscribes to only these snapshot fields (all by default)."""
+        self.host = host
+        self.port = port
+        self.fields = fields
+        self.metrics = metrics or Metrics()
+        self.reconnectDelay = reconnectDelay
+        self.playbackClock = PlaybackClock(clock=clock)
+        self.publisher = SnapshotPublisher(PlaybackSnapshot(self.playbackClock, clockState=self.playbackClock.getState()))
+        self.playlists = PlaylistCatalog(None, cacheFile=None)  #< Filled by the daemon, indexed by id and name
+        self.background = False
+        self.unattended = False
+        self.updates = 0
+        self.connected = False
+        self._sock = None
+        self._sendLock = threading.Lock()
+        self._started = False
+        self._closed = False
+        self._nextId = 0
+
+    def _start(self) -> None:
+        if not self._started:
+            self._started = True
+            threading.Thread(target=self._run, daemon=True).start()
+
+    def startInBackground(self, callback=None, playlistsCallback=None) -> None:
+        """Connects to the daemon in the background, callback(snapshot) is called on every update."""
+        if callable(callback):
+            self.publisher.addListener(lambda snapshot, changed: callback(snapshot))
+        if callable(playlistsCallback):
+            self.playlists.addListener(playlistsCallback)
+        self._start()
+
+    def startUpdateLoop(self, updateInterval=None, callback=None) -> None:
+        """The daemon does the polling, this only connects to it (updateInterval is ignored)."""
+        self.startInBackground(callback=callback)
+
+    def _run(self) -> None:
+        while not self._closed:
+            try:
+                sock = socket.create_connection((self.host, self.port))
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            except OSError as e:
+                print(f"Could not connect to the playback daemon at {self.host}:{self.port}: {e}")
+                time.sleep(self.reconnectDelay)
+                continue
+            with self._sendLock:
+                if self._closed:
+                    sock.close()
+                    return
+                self._sock = sock
+                self.connected = True
+            if self.fields != None:
+                self._send({"op": "sub", "fields": list(self.fields)})
+            for name, value in (("setBackground", self.background), ("setUnattended", self.unattended)):
+                if value:
+                    self._send({"op": "call", "name": name, "args": [True]})
+            try:
+                for line in sock.makefile("rb"):
+                    self._receive(json.loads(line))
+            except (OSError, ValueError):
+                pass
+            if not self._closed:
+                print("Lost the connection to the playback daemon.")
+            with self._sendLock:
+                self._sock = None
+                self.connected = False
+            sock.close()
+            self.publisher.publish(connected=False)
+            if not self._closed:
+                time.sleep(self.reconnectDelay)
+
+    def _receive(self, message) -> None:
+        op = message.get("op")
+        if op == "snap":
+            changes = decodeFields(message["f"], self.playbackClock)
+            if "clockState" in changes:
+                self.playbackClock.setState(changes["clockState"])
+            self.updates += 1
+            self.publisher.publish(**changes)
+        elif op == "playlists":
+            self.playlists.setPlaylists(message["items"])
+        elif op == "reply" and "error" in message:
+            print(f"Playback daemon error: {message['error']}")
+
+    def _send(self, message) -> bool:
+        with self._sendLock:
+            if self._sock == None:
+                print("Not connected to the playback daemon.")
+                return(False)
+            try:
+                self._sock.sendall(encodeMessage(message))
+                return(True)
+            except OSError as e:
+                print(f"Failed to send to the playback daemon: {e}")
+                return(False)
+
+    def _call(self, name, *args) -> bool:
+        """Sends a command without waiting for it to run, errors are printed when the daemon reports them."""
+        self._nextId += 1
+        return(self._send({"op": "call", "name": name, "args": list(args), "id": self._nextId}))
+
+    def getSnapshot(self) -> PlaybackSnapshot:
+        return(self.publisher.snapshot)
+
+    def addSnapshotListener(self, callback, fields=None) -> None:
+        """callback(snapshot, changed) is called from the connection thread when one of fields (any by default) changed."""
+        self.publisher.addListener(callback, fields)
+
+    def loadPlaylists(self, callback=None) -> None:
+        """The daemon sends the playlists on connect and whenever they change, callback(playlists) gets each list."""
+        if callable(callback):
+            self.playlists.addListener(callback)
+        self._start()
+
+    def getAvailablePlaylists(self) -> list:
+        return(self.playlists.getPlaylists())
+
+    def getPlaylistByName(self, name) -> dict:
+        return(self.playlists.getByName(name))
+
+    def getPlaylistById(self, playlistId) -> dict:
+        return(self.playlists.getById(playlistId))
+
+    def next(self) -> bool:
+        return(self._call("next"))
+
+    def previous(self) -> bool:
+        return(self._call("previous"))
+
+    def pausePlay(self) -> bool:
+        return(self._call("pausePlay"))
+
+    def likeCurrentSong(self) -> bool:
+        return(self._call("likeCurrentSong"))
+
+    def addToPlaylist(self, playlistId) -> bool:
+        return(self._call("addToPlaylist", playlistId))
+
+    def seekTo(self, seconds) -> bool:
+        return(self._call("seekTo", seconds))
+
+    def seekToPercent(self, percent) -> bool:
+        return(self._call("seekToPercent", percent))
+
+    def setBackground(self, background) -> None:
+        """Tells the daemon whether this frontend shows the playback, it polls slower once none does."""
+        self.background = background
+        if self.connected:
+            self._call("setBackground", background)
+
+    def setUnattended(self, unattended) -> None:
+        """Tells the daemon whether anyone interacts with this frontend, it polls slower once nobody does with any."""
+        self.unattended = unattended
+        if self.connected:
+            self._call("setUnattended", unattended)
+
+    def getPollCount(self) -> int:
+        """Returns the snapshot updates received, the polls themselves happen in the daemon."""
+        return(self.updates)
+
+    def getLyrics(self) -> str:
+        return(self.getSnapshot().getLyricsText())
+
+    def isPlaying(self) -> bool:
+        return(self.getSnapshot().isPlaying)
+
+    def getSongDuration(self) -> float:
+        return(self.getSnapshot().duration)
+
+    def getPlaybackPosition(self) -> float:
+        return(self.getSnapshot().getPosition())
+
+    def close(self) -> None:
+        """Disconnects for good."""
+        with self._sendLock:
+            self._closed = True
+            if self._sock != None:
+                try:
+                    self._sock.shutdown(socket.SHUT_RDWR)  #< Wakes the connection thread up
+                except OSError:
+                    pass
+
+def run():
+    parser = argparse.ArgumentParser(description="Polls Spotify once for every player frontend on this machine.")
+    parser.add_argument("--secrets", default="secrets.json", help="Spotify credentials file (default: secrets.json)")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"port to listen on (default: {DEFAULT_PORT})")
+    parser.add_argument("--metrics-port", type=int, help="serve the metrics at http://127.0.0.1:<port>/metrics")
+    parser.add_argument("--word-timings", action="store_true", help="look up enhanced LRC word timings for word by word highlighting")
+    args = parser.parse_args()
+
+    player = SpotifyPlayer(secretsFile=args.secrets, connect=False, metrics=Metrics(enabled=args.metrics_port != None),
+                           wordTimings=args.word_timings)
+    if args.metrics_port != None:
+        player.metrics.serve(port=args.metrics_port)
+    daemon = PlaybackDaemon(player, host=args.host, port=args.port)
+    print(f"Serving playback on {args.host}:{args.port}")
+    daemon.serveForever()
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,106 @@
+import threading
+
+from cache import readJson, writeJsonAtomic
+
+class PlaylistCatalog:
+    """
+    The user's playlists, cached on disk and indexed by id and by name.
+    load() fetches every page of current_user_playlists in the background, calling the listeners as pages arrive.
+    Playlists whose snapshot_id and name did not change are kept as they are, so an unchanged account
+    causes no cache write and no listener calls.
+    """
+    def __init__(self, sp, cacheFile="playlists.json", pageSize=50):
+        self.sp = sp
+        self.cacheFile = cacheFile
+        self.pageSize = pageSize  #< current_user_playlists returns at most 50 playlists per page
+        self.listeners = []
+        self.loading = False
+        self.pagesLoaded = 0
+
+        self._playlists = []  #< [{"id": str, "name": str, "snapshotId": str}] in Spotify's order
+        self._byId = {}
+        self._byName = {}
+        self._lock = threading.Lock()
+        self._setPlaylists(readJson(cacheFile, default=[]))
+
+    def _setPlaylists(self, playlists) -> None:
+        byName = {}
+        for playlist in playlists:
+            byName.setdefault(playlist["name"], playlist)  #< The first playlist wins when names repeat
+        with self._lock:
+            self._playlists = playlists
+            self._byId = {playlist["id"]: playlist for playlist in playlists}
+            self._byName = byName
+
+    def setPlaylists(self, playlists) -> None:
+        """Replaces the catalog with playlists loaded elsewhere (e.g. sent by the playback daemon) and calls the listeners."""
+        self._setPlaylists(list(playlists))
+        self._notify()
+
+    def addListener(self, callback) -> None:
+        """callback(playlists) is called from the loading thread whenever the catalog changes."""
+        self.listeners.append(callback)
+
+    def _notify(self) -> None:
+        playlists = self.getPlaylists()
+        for callback in self.listeners:
+            callback(playlists)
+
+    def load(self) -> None:
+        """Starts fetching every page of the user's playlists in the background."""
+        with self._lock:
+            if self.loading:
+                return
+            self.loading = True
+        threading.Thread(target=self._load, daemon=True).start()
+
+    def _load(self) -> None:
+        try:
+            cached = self.getPlaylists()
+            fetched = []
+            offset = 0
+            changed = False
+            while True:
+                page = self.sp.current_user_playlists(limit=self.pageSize, offset=offset)
+                items = [{"id": pl["id"], "name": pl["name"], "snapshotId": pl.get("snapshot_id")} for pl in page["items"] if pl]
+                fetched += items
+                offset += len(page["items"])
+                self.pagesLoaded += 1
+
+                # Show each page as soon as it arrives, keeping the cached tail until it is revalidated
+                if fetched != cached[:len(fetched)]:
+                    changed = True
+                    fetchedIds = {pl["id"] for pl in fetched}
+                    self._setPlaylists(fetched + [pl for pl in cached if pl["id"] not in fetchedIds])
+                    self._notify()
+                if not page.get("next") or not page["items"]:
+                    break
+
+            if changed or len(fetched) != len(cached):
+                if fetched != self.getPlaylists():
+                    self._setPlaylists(fetched)  #< Drops playlists that no longer exist
+                    self._notify()
+                self._save()
+        except Exception as e:
+            print(f"Failed to load playlists: {e}")
+        finally:
+            with self._lock:
+                self.loading = False
+
+    def _save(self) -> None:
+        try:
+            writeJsonAtomic(self.cacheFile, self.getPlaylists())
+        except OSError as e:
+            print(f"Failed to save playlists {self.cacheFile}: {e}")
+
+    def getPlaylists(self) -> list:
+        with self._lock:
+            return(list(self._playlists))
+
+    def getById(self, playlistId) -> dict:
+        with self._lock:
+            return(self._byId.get(playlistId))
+
+    def getByName(self, name) -> dict:
+        with self._lock:
+            return(self._byName.get(name))
@@ -0,0 +1,206 @@
+"""
+Soak test of the SpotifyPlayer backend against the offline fake Spotify and lyrics provider (fakespotify.py).
+
+    python soak.py [--hours 4] [--output report.json] [--min-accuracy 0.9] [--max-memory-growth 1000000]
+
+The polling loop and in-app actions (likes, playlist additions, seeks) run on simulated time while a scripted
+listener pauses, skips, seeks and leaves the device idle, with latency, 5xx errors and 429s injected into the requests.
+The report gives the API calls per minute, the CPU time used, the memory growth and how often the highlighted
+lyric line matched the true one. The exit code is 1 if a --min-accuracy or --max-memory-growth limit is exceeded.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import tracemalloc
+import contextlib
+from collections import Counter
+
+from spotify import SpotifyPlayer
+from fakespotify import SimulatedClock, Faults, FakeSpotify, FakeLyricsProvider, makeLibrary, makeScript, getTrueLineTimestamp, getOfflineFiles
+
+def makePlayer(workDir, fake, lyricsProvider, clock) -> SpotifyPlayer:
+    return(SpotifyPlayer(connect=False, transport=lambda: fake, lyricsProviders={"fake": lyricsProvider},
+                         clock=clock.now, sleep=clock.sleep, **getOfflineFiles(workDir)))
+
+class HighlightCheck:
+    """Compares the lyric line the player would highlight with the true one."""
+    def __init__(self, player, fake, lyricsProvider):
+        self.player = player
+        self.fake = fake
+        self.lyricsProvider = lyricsProvider
+        self.results = Counter()
+
+    def sample(self, now) -> None:
+        truth = self.fake.getState()
+        if truth == None:
+            self.results["idle"] += 1
+            return
+        if not self.lyricsProvider.hasLyrics(truth["track"]):
+            self.results["noLyrics"] += 1
+            return
+        snapshot = self.player.getSnapshot()  #< What the UI reads for a frame
+        if snapshot.trackId != truth["track"]["id"] or snapshot.lyrics == None:
+            self.results["wrongTrack"] += 1
+            return
+        shown = snapshot.lyrics.getTimestamp(snapshot.getLyricIndex(snapshot.getPosition()))
+        if abs(shown - getTrueLineTimestamp(truth["track"], truth["progress"])) < 0.005:
+            self.results["correct"] += 1
+        else:
+            self.results["wrongLine"] += 1
+
+    def getReport(self) -> dict:
+        checked = self.results["correct"] + self.results["wrongLine"] + self.results["wrongTrack"]
+        return({"accuracy": self.results["correct"] / checked if checked else 0.0, "checked": checked, **self.results})
+
+def settle(player, lyricsProvider, clock, timeout=1.0) -> None:
+    """
+    Lets the lyrics worker threads catch up with the simulated time: waits (in real time) until every lookup
+    due by now has answered and its result was delivered, so a fast simulation does not see lyrics arrive late.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if not lyricsProvider.hasDueCalls(clock.now()) and (not player.song.lyricsPending or lyricsProvider.inFlight):
+            return
+        time.sleep(0.0005)
+
+def runSoak(args, workDir) -> dict:
+    duration = args.hours * 3600
+    clock = SimulatedClock()
+    library = makeLibrary(trackCount=args.tracks, playlistCount=args.playlists, seed=args.seed)
+    faults = Faults(latency=tuple(args.latency), errorRate=args.error_rate, connectionErrorRate=args.connection_error_rate,
+                    rateLimitRate=args.rate_limit_rate, retryAfter=args.retry_after, seed=args.seed)
+    fake = FakeSpotify(library, clock=clock, script=makeScript(duration, seed=args.seed), faults=faults)
+    lyricsProvider = FakeLyricsProvider(library, clock=clock, latency=tuple(args.lyrics_latency), missRate=args.lyrics_miss_rate, seed=args.seed + 1)
+    player = makePlayer(workDir, fake, lyricsProvider, clock)
+    check = HighlightCheck(player, fake, lyricsProvider)
+    rng = random.Random(args.seed)
+
+    tracemalloc.start()
+    memory = []
+    wallStart = time.perf_counter()
+    cpuStart = time.process_time()
+    player.connect()
+
+    polls = 0
+    actions = Counter()
+    nextSample = 0.0
+    nextAction = rng.expovariate(1 / args.action_every)
+    nextPlaylistLoad = 0.0
+    nextMemorySample = 0.0
+    while clock.now() < duration:
+        if clock.now() >= nextMemorySample:
+            memory.append({"hour": clock.now() / 3600, "bytes": tracemalloc.get_traced_memory()[0]})
+            nextMemorySample += 3600
+        if clock.now() >= nextPlaylistLoad:
+            player.loadPlaylists()
+            while player.playlists.loading:  #< Runs on its own thread, wait so the simulation stays deterministic
+                time.sleep(0.001)
+            nextPlaylistLoad += 3600
+
+        player.poll()
+        settle(player, lyricsProvider, clock)
+        polls += 1
+        if clock.now() >= nextAction:
+            action = rng.choice(["like", "addToPlaylist", "seek"])
+            if action == "like":
+                player.likeCurrentSong()
+            elif action == "addToPlaylist" and player.getAvailablePlaylists():
+                player.addToPlaylist(rng.choice(player.getAvailablePlaylists())["id"])
+            elif action == "seek":
+                player.seekToPercent(rng.random())
+            player.writeQueue.flush()
+            actions[action] += 1
+            nextAction = clock.now() + rng.expovariate(1 / args.action_every)
+
+        wakeAt = clock.now() + player.getPollingInterval()
+        while nextSample < wakeAt:
+            if nextSample >= clock.now():  #< Samples that fell inside a request are skipped
+                clock.advance(nextSample - clock.now())
+                settle(player, lyricsProvider, clock)
+                check.sample(clock.now())
+            nextSample += args.sample_interval
+        clock.advance(wakeAt - clock.now())
+
+    cpuSeconds = time.process_time() - cpuStart
+    wallSeconds = time.perf_counter() - wallStart
+    memory.append({"hour": clock.now() / 3600, "bytes": tracemalloc.get_traced_memory()[0]})
+    peakBytes = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    end = clock.now()
+    while lyricsProvider.inFlight or player.getPrefetchStats()["inFlight"]:  #< Lookups waiting on the simulated clock would keep the interpreter from exiting
+        clock.advance(1.0)
+        time.sleep(0.001)
+    player.lyricsCache.flush()  #< Before the work directory is removed
+
+    minutes = end / 60
+    requestCounts = player.getRequestCounts()
+    growth = memory[-1]["bytes"] - memory[1 if len(memory) > 2 else 0]["bytes"]  #< From the end of the first (warm up) hour
+    return({
+        "simulatedHours": end / 3600,
+        "wallSeconds": wallSeconds,
+        "cpu": {"seconds": cpuSeconds, "secondsPerSimulatedHour": cpuSeconds / (end / 3600)},
+        "apiCallsPerMinute": {
+            "total": sum(requestCounts.values()) / minutes,
+            "byEndpoint": {endpoint: count / minutes for endpoint, count in sorted(requestCounts.items())}
+        },
+        "requests": {"client": requestCounts, "server": dict(fake.calls), "injectedFaults": dict(faults.injected)},
+        "memory": {"growthBytes": growth, "peakBytes": peakBytes, "samples": memory},
+        "highlight": check.getReport(),
+        "polls": polls,
+        "actions": dict(actions),
+        "tokenRefreshes": fake.auth_manager.refreshes,
+        "requestBudget": player.getRequestBudget(),
+        "connectionState": player.getConnectionState(),
+        "lyricsCache": player.getLyricsCacheStats(),
+        "lyricsProviderCalls": lyricsProvider.calls,
+        "lyricsFinder": player.getLyricsFinderStats(),
+        "prefetch": player.getPrefetchStats(),
+        "writeQueue": player.getWriteQueueStats()
+    })
+
+def run():
+    parser = argparse.ArgumentParser(description="Soak test of the backend against an offline fake Spotify, on simulated time.")
+    parser.add_argument("--hours", type=float, default=4, help="simulated hours to run (default: 4)")
+    parser.add_argument("--tracks", type=int, default=30, help="tracks in the fake library (default: 30)")
+    parser.add_argument("--playlists", type=int, default=120, help="playlists in the fake library (default: 120)")
+    parser.add_argument("--latency", type=float, nargs=2, default=[0.05, 0.4], metavar=("MIN", "MAX"), help="request latency range in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.01, help="chance of a 503 response per request (default: 0.01)")
+    parser.add_argument("--connection-error-rate", type=float, default=0.005, help="chance of a network error per request (default: 0.005)")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.005, help="chance of a 429 response per request (default: 0.005)")
+    parser.add_argument("--retry-after", type=float, default=2, help="Retry-After of the injected 429s in seconds (default: 2)")
+    parser.add_argument("--lyrics-latency", type=float, nargs=2, default=[0.2, 1.5], metavar=("MIN", "MAX"), help="lyrics lookup latency range in seconds")
+    parser.add_argument("--lyrics-miss-rate", type=float, default=0.1, help="share of tracks without lyrics (default: 0.1)")
+    parser.add_argument("--action-every", type=float, default=300, help="mean seconds between in-app actions (default: 300)")
+    parser.add_argument("--sample-interval", type=float, default=0.25, help="seconds between highlight accuracy samples (default: 0.25)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the report as JSON to this file (default: stdout)")
+    parser.add_argument("--min-accuracy", type=float, help="fail if the highlight accuracy is lower than this")
+    parser.add_argument("--max-memory-growth", type=int, help="fail if the memory grew by more than this many bytes")
+    parser.add_argument("--verbose", action="store_true", help="show the player's log output")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workDir:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(sys.stdout if args.verbose else devnull):
+            report = runSoak(args, workDir)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    failures = []
+    if args.min_accuracy != None and report["highlight"]["accuracy"] < args.min_accuracy:
+        failures.append(f"Highlight accuracy {report['highlight']['accuracy']:.1%} is below {args.min_accuracy:.1%}")
+    if args.max_memory_growth != None and report["memory"]["growthBytes"] > args.max_memory_growth:
+        failures.append(f"Memory grew by {report['memory']['growthBytes']} bytes, more than {args.max_memory_growth}")
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    run()
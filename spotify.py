@@ -1,89 +1,402 @@
 import time
 import json
 import threading
-import re
-import pyautogui
-import syncedlyrics
-import spotipy
-from spotipy.oauth2 import SpotifyOAuth
-
-def retryOnTimeout(func, retries=-1, backoff=2, *args, **kwargs):
-    attempt = 1
-    while True:
-        try:
-            return(func(*args, **kwargs))
-        except Exception as e:
-            print(f"Attempt {attempt} failed with error: {e}")
-            if attempt != retries:
-                time.sleep(backoff * (2 ** attempt))
-            else:
-                raise  #< Let the last exception propagate
-        attempt += 1
+import random
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from array import array
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+# pyautogui, requests, syncedlyrics and spotipy are slow to import, they are imported where they are first used
+
+from cache import LyricsCache
+from writequeue import WriteQueue
+from playlists import PlaylistCatalog
+from metrics import Metrics
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected without being attempted because its circuit breaker is open."""
+
+class CircuitBreaker:
+    """
+    Fails fast after failureThreshold consecutive failures.
+    Once resetTimeout seconds have passed a single probe call is let through (half-open),
+    its result closes the circuit again or reopens it.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, failureThreshold=5, resetTimeout=30, clock=time.monotonic):
+        self.failureThreshold = failureThreshold
+        self.resetTimeout = resetTimeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.openedAt = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Returns True if a call may be attempted now."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return(True)
+            if self.state == self.OPEN and self.clock() - self.openedAt >= self.resetTimeout:
+                self.state = self.HALF_OPEN  #< Let this call through as the probe
+                return(True)
+            return(False)  #< Open, or a probe is already in flight
+
+    def recordSuccess(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def recordFailure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failureThreshold:
+                if self.state != self.OPEN:
+                    print(f"Circuit opened after {self.failures} failures.")
+                self.state = self.OPEN
+                self.openedAt = self.clock()
+
+    def getState(self) -> str:
+        return(self.state)
+
+class RetryPolicy:
+    """
+    Retries a call with capped, fully jittered exponential backoff until it succeeds,
+    fails with a non-retryable error, runs out of attempts or would overrun its deadline.
+    """
+    def __init__(self, deadline=30, baseDelay=0.5, maxDelay=8, maxAttempts=None, breaker:CircuitBreaker=None,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.deadline = deadline        #< Maximum total seconds spent on one call, including waits
+        self.baseDelay = baseDelay
+        self.maxDelay = maxDelay
+        self.maxAttempts = maxAttempts  #< None for no limit other than the deadline
+        self.breaker = breaker
+        self.clock = clock
+        self.sleep = sleep
+
+    def isRetryable(self, error) -> bool:
+        """Network errors, 429 and 5xx responses are retryable, other 4xx (including auth) errors are not."""
+        import spotipy
+        if isinstance(error, spotipy.SpotifyException):
+            return(error.http_status == 429 or error.http_status >= 500)
+        if isinstance(error, spotipy.SpotifyOauthError):
+            return(False)
+        return(isinstance(error, OSError))  #< requests' ConnectionError and Timeout are OSErrors
+
+    def getDelay(self, attempt, error=None) -> float:
+        """Returns how long to wait before the next attempt, honoring Retry-After on 429 responses."""
+        delay = random.uniform(0, min(self.maxDelay, self.baseDelay * (2 ** attempt)))
+        retryAfter = getRetryAfter(error)
+        if retryAfter != None:
+            delay = max(delay, retryAfter)
+        return(delay)
+
+    def call(self, func, *args, **kwargs):
+        start = self.clock()
+        attempt = 0
+        while True:
+            if self.breaker and not self.breaker.allow():
+                raise CircuitOpenError("Spotify is unreachable, not retrying until the circuit breaker resets.")
+            attempt += 1
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                if not self.isRetryable(e):
+                    if self.breaker:
+                        self.breaker.recordSuccess()  #< The service answered, the request itself was bad
+                    raise
+                if self.breaker:
+                    self.breaker.recordFailure()
+                delay = self.getDelay(attempt - 1, e)
+                outOfAttempts = self.maxAttempts != None and attempt >= self.maxAttempts
+                if outOfAttempts or self.clock() - start + delay > self.deadline:
+                    print(f"Giving up after {attempt} attempts, last error: {e}")
+                    raise
+                print(f"Attempt {attempt} failed with error: {e}")
+                self.sleep(delay)
+                continue
+            if self.breaker:
+                self.breaker.recordSuccess()
+            return(result)
+
+class RateLimitedError(Exception):
+    """Raised when a request could not get a slot in the request budget in time."""
+
+class RequestBudget:
+    """
+    Token bucket shared by every Spotify request.
+    Interactive requests may use the whole bucket, background requests leave `reserve` tokens for them.
+    A 429 response pauses all requests until its Retry-After has passed.
+    """
+    INTERACTIVE = "interactive"
+    BACKGROUND = "background"
+
+    def __init__(self, rate=2.0, capacity=20, reserve=5, defaultRetryAfter=1.0, clock=time.monotonic, sleep=None):
+        self.rate = rate                            #< Tokens added per second
+        self.capacity = capacity
+        self.reserve = reserve                      #< Tokens only interactive requests may take
+        self.defaultRetryAfter = defaultRetryAfter  #< Pause used when a 429 has no Retry-After header
+        self.clock = clock
+        self.sleep = sleep                          #< Waits with this instead of the condition, for simulated clocks
+
+        self.tokens = float(capacity)
+        self.throttledUntil = 0.0
+        self.throttleEvents = 0
+        self.waits = {self.INTERACTIVE: 0, self.BACKGROUND: 0}
+        self.rejected = 0
+        self._lastRefill = clock()
+        self._cond = threading.Condition()
+
+    def _refill(self, now) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self._lastRefill) * self.rate)
+        self._lastRefill = now
+
+    def acquire(self, priority=INTERACTIVE, timeout=None) -> None:
+        """Takes a token, waiting up to timeout seconds (forever if None) before raising RateLimitedError."""
+        floor = 0 if priority == self.INTERACTIVE else self.reserve
+        with self._cond:
+            deadline = None if timeout == None else self.clock() + timeout
+            while True:
+                now = self.clock()
+                self._refill(now)
+                if now >= self.throttledUntil and self.tokens >= floor + 1:
+                    self.tokens -= 1
+                    return
+                wait = max(self.throttledUntil - now, (floor + 1 - self.tokens) / self.rate)
+                if deadline != None and now + wait > deadline:
+                    self.rejected += 1
+                    raise RateLimitedError(f"No request budget within {timeout}s for a {priority} priority request.")
+                self.waits[priority] += 1
+                if self.sleep == None:
+                    self._cond.wait(wait)
+                else:
+                    self._cond.release()
+                    try:
+                        self.sleep(wait)
+                    finally:
+                        self._cond.acquire()
+
+    def throttle(self, retryAfter=None) -> None:
+        """Pauses all requests after a 429 response."""
+        retryAfter = self.defaultRetryAfter if retryAfter == None else retryAfter
+        with self._cond:
+            self.throttledUntil = max(self.throttledUntil, self.clock() + retryAfter)
+            self.tokens = 0.0  #< Spotify says we are over the limit, whatever our estimate was
+            self.throttleEvents += 1
+        print(f"Rate limited by Spotify, pausing requests for {retryAfter}s.")
+
+    def getState(self) -> dict:
+        with self._cond:
+            now = self.clock()
+            self._refill(now)
+            return({
+                "tokens": self.tokens,
+                "capacity": self.capacity,
+                "throttledFor": max(0.0, self.throttledUntil - now),
+                "throttleEvents": self.throttleEvents,
+                "interactiveWaits": self.waits[self.INTERACTIVE],
+                "backgroundWaits": self.waits[self.BACKGROUND],
+                "rejected": self.rejected
+            })
+
+def getRetryAfter(error) -> float:
+    """Returns the Retry-After delay of a 429 response in seconds, or None."""
+    import spotipy
+    if not isinstance(error, spotipy.SpotifyException) or error.http_status != 429:
+        return(None)
+    headers = error.headers or {}
+    try:
+        return(float(headers.get("Retry-After", headers.get("retry-after"))))
+    except (TypeError, ValueError):
+        return(None)
+
+def retryOnTimeout(func, *args, policy:RetryPolicy=None, **kwargs):
+    """Calls func, retrying according to policy (a default deadline-bound RetryPolicy if none is given)."""
+    return((policy or RetryPolicy()).call(func, *args, **kwargs))
+
+def parseLrcTime(tag) -> float:
+    """Converts an LRC time tag body ("mm:ss", "mm:ss.xx" or "mm:ss:xx") to seconds, None if it is not a time."""
+    minutes, separator, seconds = tag.partition(":")
+    if not separator or not minutes.isdecimal():
+        return(None)
+    seconds = seconds.replace(":", ".", 1)
+    if not seconds.replace(".", "", 1).isdecimal():
+        return(None)
+    return(int(minutes) * 60 + float(seconds))
 
 class Lyrics:
+    """
+    Immutable lyrics timeline.
+    Timestamps are kept in a sorted array with a parallel tuple of lines, so
+    time -> index lookups are a bisect and index -> text lookups are O(1).
+    Enhanced LRC word timings (<mm:ss.xx> tags) are kept per line in words, None when the lyrics have none.
+    """
+    __slots__ = ("synced", "timestamps", "lines", "words", "metadata", "source", "_text")
+
     def __init__(self, lyrics):
-        self.synced = self._isSynced(lyrics)
-        self.lyrics = self._convertToDict(lyrics)
+        self.source = lyrics  #< The LRC text (or None) the timeline was parsed from, Lyrics(source) rebuilds it
+        self.metadata = {}  #< [ar:], [ti:], [offset:] and other ID tags
+        timeline = self._parse(lyrics)
+        self.synced = timeline != None
+        if not self.synced:
+            timeline = {0.0: ("No lyrics available, you will have to guess for this one :(" if lyrics == None else lyrics, None)}
+        ordered = sorted(timeline.items(), key=lambda item: item[0])
+        self.timestamps = array("d", (timestamp for timestamp, _ in ordered))
+        self.lines = tuple(text for _, (text, _) in ordered)
+        self.words = tuple(words for _, (_, words) in ordered)
+        if not any(self.words):
+            self.words = None
+        if self.synced:
+            self._text = "\n".join(self.lines) + "\n"  #< Joined once instead of on every getLyrics call
+        else:
+            self._text = self.lines[0]
 
-    def _isSynced(self, lyrics) -> bool:
-        """ Checks if the lyrics are synced. """
+    def _parse(self, lyrics) -> dict:
+        """
+        Parses LRC text in one pass into {timestamp: (text, words)}, with words a tuple of (start, word) or None,
+        returns None when the text has no time tags (plain text lyrics).
+        A line may carry several timestamps ([00:12.00][01:30.00]chorus), ID tags are collected in metadata
+        and the [offset:] tag (in milliseconds, positive shows the lyrics earlier) is applied to every timestamp.
+        """
         if lyrics == None:
-            return(False)
-        timestampPattern = re.compile(r"\[\d{1,2}:\d{2}(?:\.\d{2})?\]")
-        return(bool(timestampPattern.search(lyrics)))
-    
+            return(None)
+        timeline = {0.0: ("", None)}  #< Initialize with a default entry for 0 seconds
+        synced = False
+
+        for line in lyrics.splitlines():
+            if not line.startswith("["):
+                line = line.strip()
+                if not line.startswith("["):
+                    continue
+            times = []
+            while line.startswith("["):
+                close = line.find("]")
+                if close == -1:
+                    break
+                tag = line[1:close]
+                timestamp = parseLrcTime(tag)
+                if timestamp != None:
+                    times.append(timestamp)
+                else:
+                    key, separator, value = tag.partition(":")
+                    if not separator or not key.isalpha() or times:
+                        break  #< Not a tag, e.g. "[Chorus]" as part of the text
+                    self.metadata[key.strip().lower()] = value.strip()
+                line = line[close + 1:]
+            if not times:
+                continue
+            synced = True
+            if "<" in line:
+                text, words = self._parseWords(line)
+                for timestamp in times:
+                    shift = timestamp - times[0]  #< Word times belong to the first timestamp of the line
+                    timeline[timestamp] = (text, tuple((start + shift, word) for start, word in words) if words else None)
+            else:
+                entry = (line.strip(), None)
+                for timestamp in times:
+                    timeline[timestamp] = entry
+
+        if not synced:
+            return(None)
+        offset = 0.0
+        try:
+            offset = int(self.metadata.get("offset", 0)) / 1000
+        except ValueError:
+            pass
+        if offset:
+            shifted = {}
+            for timestamp, (text, words) in timeline.items():
+                if words:
+                    words = tuple((start - offset, word) for start, word in words)
+                shifted[max(0.0, timestamp - offset)] = (text, words)
+            timeline = shifted
+        return(timeline)
+
+    def _parseWords(self, line) -> tuple:
+        """Splits a line with <mm:ss.xx> word tags into its plain text and its (start, word) pairs."""
+        words = []
+        text = []
+        leading = ""
+        start = None
+        position = 0
+        while position < len(line):
+            if line[position] == "<":
+                close = line.find(">", position)
+                timestamp = parseLrcTime(line[position + 1:close]) if close != -1 else None
+                if timestamp != None:
+                    start = timestamp
+                    position = close + 1
+                    continue
+            nextTag = line.find("<", position + 1)
+            nextTag = len(line) if nextTag == -1 else nextTag
+            word = line[position:nextTag]
+            text.append(word)
+            if start != None and word.strip():
+                words.append((start, leading + word if not words else word))
+                start = None
+            elif words:
+                words[-1] = (words[-1][0], words[-1][1] + word)  #< Untimed text belongs to the word before it
+            else:
+                leading += word
+            position = nextTag
+        return("".join(text).strip(), tuple(words) or None)
+
     def isSynced(self) -> bool:
         """ Returns True if the lyrics are synced, False otherwise. """
         return(self.synced)
-    
-    def _convertToDict(self, lyrics) -> dict:
-        if lyrics == None:
-            return({0.0: "No lyrics available, you will have to guess for this one :("})
-
-        if not self.synced:
-            return({0.0: lyrics})
-
-        lyricsDict = {0.0: ""}                        #< Initialize with a default entry for 0 seconds
-        for line in lyrics.strip().splitlines():
-            timestamp, text = line[1:].split("]", 1)
-            timestamp = self.lrcToInr(timestamp)
-            lyricsDict[timestamp] = text.strip()
-        return(lyricsDict)
 
     def lrcToInr(self, lrcTimestamp) -> float:
         """Converts LRC time format ([mm:ss.xx]) to total seconds."""
-        lrcTimestamp = lrcTimestamp.strip("[]")  #< Remove brackets
-        pattern = re.compile(r"(\d+):(\d+(?:\.\d+)?)")
-        match = pattern.match(lrcTimestamp)
+        return(parseLrcTime(lrcTimestamp.strip("[]")))
+
+    def getIndex(self, currentTime) -> int:
+        """Returns the index of the line being sung at currentTime."""
+        return(max(0, bisect_right(self.timestamps, currentTime) - 1))
+
+    def getLine(self, index) -> str:
+        """Returns the text of the line at index."""
+        return(self.lines[index])
+
+    def getTimestamp(self, index) -> float:
+        """Returns the start time of the line at index."""
+        return(self.timestamps[index])
 
-        if match:
-            minutes, seconds = match.groups()
-            minutes = int(minutes)
-            seconds = float(seconds)
+    def getLineCount(self) -> int:
+        return(len(self.lines))
 
-            totalTime = (minutes * 60) + seconds  #< Removed hours from calculation
-            return(totalTime)                     #< Convert to integer if needed
-        return(None)                              #< Invalid timestamp format
+    def hasWordTimings(self) -> bool:
+        """Returns True if the lyrics carry enhanced LRC word timings."""
+        return(self.words != None)
+
+    def getWords(self, index) -> tuple:
+        """Returns the (start, word) pairs of the line at index, or None if it has no word timings."""
+        return(self.words[index] if self.words != None else None)
+
+    def getWordIndex(self, index, currentTime) -> int:
+        """Returns the index of the word being sung at currentTime in the line at index, -1 before its first word."""
+        words = self.getWords(index)
+        if not words:
+            return(-1)
+        wordIndex = -1
+        for start, _ in words:  #< A handful of words per line, a scan beats building a key list
+            if start > currentTime:
+                break
+            wordIndex += 1
+        return(wordIndex)
 
     def getNearestTimestamp(self, currentTime) -> float:
-        timestamps = reversed(self.lyrics.keys())
-        for timestamp in timestamps:
-            if currentTime >= timestamp:
-                return(timestamp)
-        return(0.0)
+        return(self.timestamps[self.getIndex(currentTime)])
 
     def getLyricsFromTimeStamp(self, currentTime) -> str:
-        return(self.lyrics[self.getNearestTimestamp(currentTime)])
+        return(self.lines[self.getIndex(currentTime)])
     
     def getLyrics(self) -> str:
         """Returns the lyrics as a string."""
-        if not self.synced:
-            return(self.lyrics[0.0])
-        
-        lyrics = ""
-        for text in self.lyrics.values():
-            lyrics += f"{text}\n"
-        return(lyrics)
+        return(self._text)
 
     def __str__(self):
         return(self.getLyrics())
@@ -91,9 +404,515 @@ class Lyrics:
     def __getitem__(self, currentTime):
         return(self.getLyricsFromTimeStamp(currentTime))
 
+class SpotifyClient:
+    """
+    Wraps spotipy.Spotify, counting requests per endpoint and tracking the authentication state locally.
+    The token expiry and 401 responses decide when to refresh, so no probe request is needed before a call.
+    Every request takes a token from the shared RequestBudget first, polling endpoints at background priority.
+    sp may also be a function returning the spotipy object, it is then called (and spotipy imported) on first use.
+    clock and sleep are used by the default budget, circuit breaker and retry policies.
+    Request latencies and budget waits are recorded in metrics.
+    """
+    BACKGROUND_ENDPOINTS = {"current_playback", "current_user_playlists", "current_user", "queue"}
+    INTERACTIVE_BUDGET_TIMEOUT = 5  #< Seconds an action waits for budget before giving up
+    FRESH_TOKEN_AGE = 60  #< A 401 with a token younger than this (in seconds) is not an expired token, e.g. a missing scope
+
+    def __init__(self, sp:"spotipy.Spotify", retryPolicies:dict=None, defaultPolicy:RetryPolicy=None, budget:RequestBudget=None,
+                 clock=time.monotonic, sleep=time.sleep, metrics:Metrics=None):
+        self.sp = None if callable(sp) else sp
+        self.metrics = metrics or Metrics()
+        self._createSpotify = sp if callable(sp) else None
+        self.budget = budget or RequestBudget(clock=clock, sleep=sleep)
+        self.breaker = CircuitBreaker(clock=clock)  #< Shared by the default policies, they all talk to the same service
+        policy = lambda **kwargs: RetryPolicy(breaker=self.breaker, clock=clock, sleep=sleep, **kwargs)
+        self.defaultPolicy = defaultPolicy or policy(deadline=10)
+        self.retryPolicies = {
+            "current_playback": policy(deadline=5, maxDelay=2),
+            "seek_track": policy(deadline=2, maxAttempts=2),  #< Interactive, a late seek is useless
+            "current_user_saved_tracks_add": policy(deadline=10),
+            "playlist_add_items": policy(deadline=10),
+            "current_user_playlists": policy(deadline=20),
+        }
+        self.retryPolicies.update(retryPolicies or {})
+        self.clock = clock
+        self.tokenInfo = None
+        self.needsRefresh = False
+        self.refreshedAt = None  #< When the token was last refreshed or logged in for, by clock
+        self.requestCounts = Counter()
+        self._lock = threading.Lock()
+        self._authLock = threading.Lock()
+        self._createLock = threading.Lock()
+
+    def getSpotify(self) -> "spotipy.Spotify":
+        """Returns the wrapped spotipy object, creating it on first use."""
+        if self.sp == None:
+            with self._createLock:
+                if self.sp == None:
+                    self.sp = self._createSpotify()
+        return(self.sp)
+
+    @property
+    def authManager(self):
+        return(self.getSpotify().auth_manager)
+
+    def __getattr__(self, endpoint):
+        attribute = getattr(self.getSpotify(), endpoint)
+        if not callable(attribute):
+            return(attribute)
+        return(lambda *args, **kwargs: self.request(endpoint, *args, **kwargs))
+
+    def _count(self, endpoint) -> None:
+        with self._lock:
+            self.requestCounts[endpoint] += 1
+
+    def getRetryPolicy(self, endpoint) -> RetryPolicy:
+        return(self.retryPolicies.get(endpoint, self.defaultPolicy))
+
+    def setRetryPolicy(self, endpoint, policy:RetryPolicy) -> None:
+        """Sets the retry policy used for calls to endpoint."""
+        self.retryPolicies[endpoint] = policy
+
+    def request(self, endpoint, *args, **kwargs):
+        """Calls the spotipy method named endpoint through its retry policy."""
+        return(self.getRetryPolicy(endpoint).call(self._call, endpoint, *args, **kwargs))
+
+    def _call(self, endpoint, *args, **kwargs):
+        import spotipy
+        try:
+            return(self._send(endpoint, *args, **kwargs))
+        except spotipy.SpotifyException as e:
+            if e.http_status != 401:
+                raise
+            if self.refreshedAt != None and self.clock() - self.refreshedAt < self.FRESH_TOKEN_AGE:
+                raise  #< Refreshing again would not help
+            self.needsRefresh = True  #< The token was rejected, refresh it and try once more
+            if not self.isAuthenticated():
+                raise
+        return(self._send(endpoint, *args, **kwargs))
+
+    def _send(self, endpoint, *args, **kwargs):
+        import spotipy
+        if endpoint in self.BACKGROUND_ENDPOINTS:
+            with self.metrics.measure("spotify_budget_wait_seconds", priority=RequestBudget.BACKGROUND):
+                self.budget.acquire(RequestBudget.BACKGROUND)
+        else:
+            with self.metrics.measure("spotify_budget_wait_seconds", priority=RequestBudget.INTERACTIVE):
+                self.budget.acquire(RequestBudget.INTERACTIVE, timeout=self.INTERACTIVE_BUDGET_TIMEOUT)
+        self._count(endpoint)
+        try:
+            with self.metrics.measure("spotify_request_seconds", endpoint=endpoint):
+                return(getattr(self.getSpotify(), endpoint)(*args, **kwargs))
+        except spotipy.SpotifyException as e:
+            self.metrics.increment("spotify_request_errors_total", endpoint=endpoint, status=e.http_status)
+            if e.http_status == 429:
+                self.budget.throttle(getRetryAfter(e))
+            raise
+        except Exception:
+            self.metrics.increment("spotify_request_errors_total", endpoint=endpoint, status="network")
+            raise
+
+    def authenticate(self, forceRefresh=False) -> bool:
+        """Makes sure there is a valid access token, refreshing it or logging in only when needed."""
+        import spotipy
+        with self._authLock:
+            try:
+                tokenInfo = self.authManager.cache_handler.get_cached_token()
+                if tokenInfo == None:
+                    self._count("token")
+                    self.authManager.get_access_token(as_dict=False)  #< Runs the OAuth login flow
+                    tokenInfo = self.authManager.cache_handler.get_cached_token()
+                    self.refreshedAt = self.clock()
+                elif forceRefresh or self.authManager.is_token_expired(tokenInfo):
+                    self._count("token_refresh")
+                    tokenInfo = self.authManager.refresh_access_token(tokenInfo["refresh_token"])
+                    self.refreshedAt = self.clock()
+            except (spotipy.SpotifyException, spotipy.SpotifyOauthError) as e:
+                print(f"Authentication failed with error: {e}")
+                tokenInfo = None
+            except OSError as e:  #< requests' ConnectionError and Timeout, try again on the next call
+                print(f"Could not reach Spotify to authenticate: {e}")
+                return(False)
+            self.tokenInfo = tokenInfo
+            self.needsRefresh = False
+            return(tokenInfo != None)
+
+    def isAuthenticated(self) -> bool:
+        """Checks the token locally, only touching the network when it has to be refreshed."""
+        tokenInfo = self.tokenInfo
+        if tokenInfo != None and not self.needsRefresh and not self.authManager.is_token_expired(tokenInfo):
+            return(True)
+        return(self.authenticate(forceRefresh=self.needsRefresh))
+
+    def getRequestCounts(self) -> dict:
+        with self._lock:
+            return(dict(self.requestCounts))
+
+class SharedRequest:
+    """A request in flight whose result is shared by every caller that asked for it meanwhile."""
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+    def wait(self):
+        self.done.wait()
+        if self.error != None:
+            raise self.error
+        return(self.result)
+
+LYRICS_PROVIDERS = ("Musixmatch", "Lrclib", "NetEase", "Megalobiz", "Genius")  #< syncedlyrics provider names
+
+def searchLyrics(searchTerm, provider, wordTimings=False) -> str:
+    """
+    Default lyrics provider, returns the LRC text (plain text if there are no synced lyrics) the syncedlyrics provider
+    named provider finds for "title - artist", or None. The provider class is called directly because syncedlyrics.search
+    swallows network errors, which would make a failed lookup look like a song without lyrics.
+    With wordTimings, Musixmatch is asked for enhanced LRC (<mm:ss.xx> word tags) and falls back to its line lyrics without them.
+    """
+    from syncedlyrics import providers
+    if provider == "Musixmatch" and wordTimings:
+        lyrics = providers.Musixmatch(enhanced=True).get_lrc(searchTerm)
+    else:
+        lyrics = getattr(providers, provider)().get_lrc(searchTerm)
+    if lyrics == None:
+        return(None)
+    return(lyrics.synced or lyrics.unsynced)
+
+def makeLyricsProviders(names=LYRICS_PROVIDERS, wordTimings=False) -> dict:
+    """Returns one provider function per syncedlyrics provider, so they can be queried concurrently."""
+    return({name: (lambda searchTerm, name=name: searchLyrics(searchTerm, name, wordTimings)) for name in names})
+
+class LyricsFinder:
+    """
+    Looks lyrics up on every provider at once in a thread pool.
+    The first synced result wins, plain text lyrics are only used once no provider can beat them,
+    and providers that have not answered after timeout seconds are given up on.
+    Starting a new lookup cancels the previous one: its queued searches are dropped and its result is never delivered.
+    """
+    def __init__(self, providers:dict=None, timeout=8.0, metrics:Metrics=None):
+        self.providers = providers or makeLyricsProviders()  #< name -> function("title - artist") returning LRC text or None
+        self.timeout = timeout
+        self.metrics = metrics or Metrics()
+        self.stats = Counter()
+        self._executor = None
+        self._generation = 0
+        self._futures = ()
+        self._lock = threading.Lock()
+
+    def find(self, searchTerm, callback) -> None:
+        """
+        Starts looking searchTerm up and returns right away.
+        callback(lrc, lyrics, conclusive) is called from a worker thread with the LRC text and Lyrics found (both None
+        if none were), conclusive is False when providers failed or timed out so the miss should not be cached.
+        """
+        with self._lock:
+            if self._executor == None:
+                self._executor = ThreadPoolExecutor(max_workers=2 * len(self.providers), thread_name_prefix="lyrics")
+            self._cancel()
+            generation = self._generation
+            futures = {self._executor.submit(self._search, name, provider, searchTerm): name for name, provider in self.providers.items()}
+            self._futures = tuple(futures)
+            self.stats["lookups"] += 1
+        threading.Thread(target=self._collect, args=(generation, futures, callback), daemon=True).start()
+
+    def cancel(self) -> None:
+        """Cancels the lookup in progress, if any."""
+        with self._lock:
+            self._cancel()
+
+    def _cancel(self) -> None:
+        self._generation += 1
+        for future in self._futures:
+            future.cancel()  #< Only searches still waiting for a worker can be cancelled, running ones are ignored
+        self._futures = ()
+
+    def _isStale(self, generation) -> bool:
+        return(generation != self._generation)
+
+    def _search(self, name, provider, searchTerm):
+        with self.metrics.measure("lyrics_lookup_seconds", source=name):
+            lrc = provider(searchTerm)
+        return((lrc, Lyrics(lrc)) if lrc and lrc.strip() else None)
+
+    def _collect(self, generation, futures, callback) -> None:
+        deadline = time.monotonic() + self.timeout
+        pending = set(futures)
+        found = None
+        conclusive = True
+        while pending and not self._isStale(generation):
+            done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done:
+                self._count("timeouts", len(pending))
+                conclusive = False
+                break
+            for future in done:
+                if future.cancelled():
+                    continue
+                if future.exception() != None:
+                    print(f"Lyrics provider {futures[future]} failed: {future.exception()}")
+                    conclusive = False
+                    continue
+                result = future.result()
+                if result != None and (found == None or result[1].isSynced() and not found[1].isSynced()):
+                    found = result + (futures[future],)
+            if found != None and found[1].isSynced():
+                break  #< Nothing beats synced lyrics, stop waiting for the slower providers
+
+        for future in pending:
+            future.cancel()
+        if self._isStale(generation):
+            self._count("cancelled")
+            return
+        if found != None:
+            self._count("won:" + found[2])
+        callback(found[0] if found else None, found[1] if found else None, conclusive or found != None)
+
+    def _count(self, key, amount=1) -> None:
+        with self._lock:
+            self.stats[key] += amount
+
+    def searchInOrder(self, searchTerm) -> tuple:
+        """
+        Asks the providers one after the other on the calling thread, for background work that must not crowd them.
+        Returns (lrc, conclusive) like the find() callback, stopping at the first synced result.
+        """
+        found = None
+        conclusive = True
+        for name, provider in self.providers.items():
+            try:
+                result = self._search(name, provider, searchTerm)
+            except Exception as e:
+                print(f"Lyrics provider {name} failed: {e}")
+                conclusive = False
+                continue
+            if result != None and result[1].isSynced():
+                return((result[0], True))
+            found = found or result
+        return((found[0] if found else None, conclusive or found != None))
+
+    def getStats(self) -> dict:
+        with self._lock:
+            return(dict(self.stats))
+
+class LyricsPrefetcher:
+    """
+    Looks up the lyrics of the next tracks in the user's queue into the lyrics cache, so they show up instantly.
+    Runs at low priority: the queue is fetched at background budget priority, at most maxInFlight lookups run at once
+    and they wait while isBusy() (a foreground lookup is running). The hit rate is the share of started songs that were prefetched.
+    """
+    def __init__(self, sp:SpotifyClient, lyricsCache:LyricsCache, lyricsFinder:LyricsFinder, depth=3, maxInFlight=1,
+                 isBusy=None, maxRemembered=100):
+        self.sp = sp
+        self.lyricsCache = lyricsCache
+        self.lyricsFinder = lyricsFinder
+        self.depth = depth                  #< How many upcoming tracks to prefetch
+        self.isBusy = isBusy or (lambda: False)
+        self.maxRemembered = maxRemembered  #< Prefetched track ids kept to count hits
+        self.hits = 0
+        self.misses = 0
+        self.fetched = 0
+        self.skipped = 0                    #< Upcoming tracks that were already cached
+        self.cancelled = 0
+        self._prefetched = OrderedDict()
+        self._futures = {}                  #< trackId -> Future of a queued or running prefetch
+        self._generation = 0
+        self._executor = ThreadPoolExecutor(max_workers=maxInFlight, thread_name_prefix="prefetch")
+        self._lock = threading.Lock()
+
+    def onTrackChange(self, trackId) -> None:
+        """Counts whether trackId was prefetched, then refreshes the prefetched tracks from the queue in the background."""
+        with self._lock:
+            if self._prefetched.pop(trackId, None) != None:
+                self.hits += 1
+            else:
+                self.misses += 1
+            self._generation += 1
+            generation = self._generation
+        threading.Thread(target=self._refresh, args=(generation,), daemon=True).start()
+
+    def _refresh(self, generation) -> None:
+        try:
+            queue = self.sp.queue()
+        except Exception as e:
+            print(f"Failed to get the queue for prefetching: {e}")
+            return
+        upcoming = [track for track in (queue or {}).get("queue", []) if track and track.get("id")][:self.depth]
+        upcomingIds = {track["id"] for track in upcoming}
+        with self._lock:
+            if generation != self._generation:
+                return  #< The track changed again, a newer refresh is on its way
+            for trackId in list(self._futures):
+                if trackId not in upcomingIds and self._futures[trackId].cancel():
+                    del self._futures[trackId]
+                    self.cancelled += 1
+            for track in upcoming:
+                if track["id"] in self._futures or track["id"] in self._prefetched:
+                    continue
+                if self.lyricsCache.contains(track["id"]):
+                    self.skipped += 1
+                    continue
+                self._futures[track["id"]] = self._executor.submit(self._prefetch, track)
+
+    def _prefetch(self, track) -> None:
+        try:
+            while self.isBusy():
+                time.sleep(0.25)  #< The song being played comes first
+            title = track["name"]
+            artist = track["artists"][0]["name"] if track.get("artists") else "Unknown Artist"
+            lrc, conclusive = self.lyricsFinder.searchInOrder("{} - {}".format(title, artist))
+            if lrc != None or conclusive:
+                self.lyricsCache.store(lrc, track["id"], title, artist)
+            with self._lock:
+                self.fetched += 1
+                self._prefetched[track["id"]] = True
+                while len(self._prefetched) > self.maxRemembered:
+                    self._prefetched.popitem(last=False)
+        except Exception as e:
+            print(f"Failed to prefetch the lyrics of {track.get('name')}: {e}")
+        finally:
+            with self._lock:
+                self._futures.pop(track["id"], None)
+
+    def getStats(self) -> dict:
+        with self._lock:
+            started = self.hits + self.misses
+            return({
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": self.hits / started if started else 0.0,
+                "fetched": self.fetched,
+                "skipped": self.skipped,
+                "cancelled": self.cancelled,
+                "inFlight": len(self._futures)
+            })
+
+class PlaybackSnapshot:
+    """
+    Immutable view of the playback, published by Song after every poll and lyrics lookup.
+    Readers take the whole snapshot with a single attribute read and never see half an update
+    (the new lyrics with the old progress), writers swap in a new one made with replace().
+    """
+    FIELDS = ("connected", "trackId", "songName", "artistName", "artistsName", "albumName", "isPlaying", "progress",
+              "duration", "lyrics", "lyricsPending", "clockState")
+    DEFAULTS = {"connected": False, "isPlaying": False, "progress": 0.0, "lyricsPending": False}
+    __slots__ = FIELDS + ("version", "playbackClock")
+
+    def __init__(self, playbackClock, version=0, **fields):
+        unknown = set(fields).difference(self.FIELDS)
+        if unknown:
+            raise TypeError(f"Unknown playback snapshot fields: {', '.join(sorted(unknown))}")
+        setField = object.__setattr__
+        setField(self, "playbackClock", playbackClock)
+        setField(self, "version", version)  #< Incremented by every replace()
+        for name in self.FIELDS:
+            setField(self, name, fields.get(name, self.DEFAULTS.get(name)))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("PlaybackSnapshot is immutable, publish a new one made with replace()")
+
+    def __delattr__(self, name):
+        raise AttributeError("PlaybackSnapshot is immutable")
+
+    def replace(self, **changes) -> "PlaybackSnapshot":
+        """Returns a copy with the given fields changed."""
+        fields = {name: getattr(self, name) for name in self.FIELDS}
+        fields.update(changes)
+        return(PlaybackSnapshot(self.playbackClock, self.version + 1, **fields))
+
+    def getChanges(self, previous) -> frozenset:
+        """Returns the names of the fields that differ from the previous snapshot (every field if it is None)."""
+        if previous == None:
+            return(frozenset(self.FIELDS))
+        return(frozenset(name for name in self.FIELDS if getattr(self, name) != getattr(previous, name)))
+
+    def getPosition(self) -> float:
+        """Returns the playback position extrapolated from the clock state of this snapshot, in seconds."""
+        return(self.playbackClock.getTime(self.clockState))
+
+    def isSynced(self) -> bool:
+        return(self.lyrics != None and self.lyrics.isSynced())
+
+    def getLyricIndex(self, at=None) -> int:
+        """Returns the index of the lyric line at the given time (the polled progress by default), -1 without lyrics."""
+        if self.lyrics == None:
+            return(-1)
+        return(self.lyrics.getIndex(self.progress if at == None else at))
+
+    def getLyricsText(self) -> str:
+        """Returns the lyrics as text, or the placeholder shown instead of them."""
+        if not self.connected:
+            return("Connecting to Spotify...")
+        if self.lyricsPending:
+            return("Looking for lyrics...")
+        return(self.lyrics.getLyrics() if self.lyrics else "No lyrics available for this song :(")
+
+    def getProgressPercent(self) -> float:
+        return(self.progress/self.duration if self.duration else 0.0)
+
+class SnapshotPublisher:
+    """
+    Holds the current PlaybackSnapshot. Writers swap in new ones under a lock only they take, readers read
+    the snapshot attribute without waiting, and listeners are called with the fields that changed.
+    """
+    def __init__(self, snapshot:PlaybackSnapshot):
+        self.snapshot = snapshot
+        self.listeners = []
+        self.lock = threading.Lock()
+
+    def addListener(self, callback, fields=None) -> None:
+        """
+        callback(snapshot, changed) is called from the publishing thread after a new snapshot is swapped in,
+        changed being the names of the fields that differ from the previous one. With fields (names of
+        PlaybackSnapshot.FIELDS) it is only called when one of them changed.
+        """
+        self.listeners.append((callback, frozenset(fields) if fields != None else None))
+
+    def publish(self, **changes) -> PlaybackSnapshot:
+        """Swaps in a new snapshot with the given fields changed and notifies the listeners."""
+        with self.lock:
+            previous, snapshot = self.swap(changes)
+        self.notify(previous, snapshot)
+        return(snapshot)
+
+    def swap(self, changes) -> tuple:
+        """Must be called holding lock, so concurrent writers never drop each other's changes. Returns (previous, new)."""
+        previous = self.snapshot
+        self.snapshot = previous.replace(**changes)  #< A single reference assignment, atomic for readers
+        return(previous, self.snapshot)
+
+    def notify(self, previous, snapshot) -> None:
+        changed = snapshot.getChanges(previous)
+        if not changed:
+            return
+        for callback, fields in self.listeners:
+            if fields == None or not fields.isdisjoint(changed):
+                callback(snapshot, changed)
+
 class Song:
-    def __init__(self, sp:spotipy.Spotify):
+    """
+    The current song as seen by the polling thread. Its fields are the poller's working copy, other threads should read
+    the PlaybackSnapshot published after every change (getSnapshot) and subscribe to changes with addSnapshotListener.
+    """
+    def __init__(self, sp:"spotipy.Spotify", lyricsCache:LyricsCache=None, writeQueue:WriteQueue=None, maxSnapshotAge=3.0,
+                 clock=time.monotonic, lyricsFinder:LyricsFinder=None, metrics:Metrics=None, prefetchDepth=3,
+                 playbackClock:"PlaybackClock"=None):
         self.sp = sp
+        self.metrics = metrics or Metrics()
+        self.playbackClock = playbackClock or PlaybackClock(clock=clock)
+        self.lyricsCache = lyricsCache
+        self.lyricsFinder = lyricsFinder or LyricsFinder(metrics=self.metrics)
+        self.prefetcher = None
+        if lyricsCache != None and prefetchDepth > 0:
+            self.prefetcher = LyricsPrefetcher(sp, lyricsCache, self.lyricsFinder, depth=prefetchDepth, isBusy=lambda: self.lyricsPending)
+        self.writeQueue = writeQueue or WriteQueue(sp)
+        self.maxSnapshotAge = maxSnapshotAge  #< Actions reuse the last playback response while it is younger than this
+        self.clock = clock
+        self.lastPlayback = None              #< Last current_playback response
+        self.lastPlaybackTime = None
+        self.lastPlaybackSentAt = None        #< When the request behind lastPlayback was sent
+        self._playbackRequest = None
+        self._playbackLock = threading.Lock()
+        self.trackId = None
         self.songName = None
         self.artistName = None
         self.albumName = None
@@ -101,98 +920,465 @@ class Song:
         self.progress = 0.0
         self.duration = None
         self.lyrics = None
+        self.lyricsPending = False  #< True while the lyrics of the current song are being looked up
+        self.publisher = SnapshotPublisher(PlaybackSnapshot(self.playbackClock, clockState=self.playbackClock.getState()))
+
+    def addSnapshotListener(self, callback, fields=None) -> None:
+        """See SnapshotPublisher.addListener."""
+        self.publisher.addListener(callback, fields)
+
+    def getSnapshot(self) -> PlaybackSnapshot:
+        return(self.publisher.snapshot)
+
+    def publish(self, **changes) -> PlaybackSnapshot:
+        return(self.publisher.publish(**changes))
+
+    def setPosition(self, seconds) -> None:
+        """Moves the playback clock to seconds (after a seek) and publishes it."""
+        self.playbackClock.setTime(seconds)
+        self.publish(clockState=self.playbackClock.getState())
+
+    def getPlayback(self, maxAge=None) -> dict:
+        """
+        Returns the current playback, reusing the last response if it is younger than maxAge seconds.
+        Concurrent callers that need a fresh response share a single request.
+        """
+        if maxAge != None and self.lastPlaybackTime != None and self.clock() - self.lastPlaybackTime <= maxAge:
+            return(self.lastPlayback)
+
+        with self._playbackLock:
+            request = self._playbackRequest
+            isOwner = request == None
+            if isOwner:
+                request = self._playbackRequest = SharedRequest()
+        if not isOwner:
+            return(request.wait())
+
+        try:
+            sentAt = self.clock()
+            request.result = self.sp.current_playback()
+            self.lastPlayback = request.result
+            self.lastPlaybackSentAt = sentAt
+            self.lastPlaybackTime = self.clock()
+        except Exception as e:
+            request.error = e
+        finally:
+            with self._playbackLock:
+                self._playbackRequest = None
+            request.done.set()
+        return(request.wait())
 
     def updateSongInfo(self) -> bool:
-        current = retryOnTimeout(self.sp.current_playback)
+        current = self.getPlayback()
         if current == None or current.get("item") == None:
             return(False)
 
         track = current["item"]
         songName = track["name"]
+        previousId, self.trackId = self.trackId, track.get("id")
         self.artistsName = [artist["name"] for artist in track["artists"]]
         self.artistName = self.artistsName[0] if self.artistsName else "Unknown Artist"
         self.albumName = track["album"]["name"]
         self.isPlaying = current.get("is_playing", False)
         self.progress = current["progress_ms"]*0.001  #< Convert ms to seconds
         self.duration = track["duration_ms"]*0.001    #< Convert ms to seconds
-        if songName != self.songName and type(songName) == str:
+        if (self.trackId, songName) != (previousId, self.songName) and type(songName) == str:  #< Songs with the same name differ by id
             self.songName = songName
-            self.lyrics = self._findLyrics()
+            self._findLyrics()
+            if self.prefetcher != None:
+                self.prefetcher.onTrackChange(self.trackId)
+        error = self.playbackClock.sync(self.progress, self.isPlaying, self.lastPlaybackSentAt, self.lastPlaybackTime,
+                                        current.get("timestamp"), self.trackId)
+        self.metrics.observe("playback_clock_error_seconds", abs(error))
+
+        with self.publisher.lock:  #< The lyrics are read under the lock, a lookup finishing meanwhile is not lost
+            previous, snapshot = self.publisher.swap({
+                "trackId": self.trackId, "songName": self.songName, "artistName": self.artistName, "artistsName": self.artistsName,
+                "albumName": self.albumName, "isPlaying": self.isPlaying, "progress": self.progress, "duration": self.duration,
+                "lyrics": self.lyrics, "lyricsPending": self.lyricsPending, "clockState": self.playbackClock.getState()
+            })
+        self.publisher.notify(previous, snapshot)
         return(True)
 
-    def _findLyrics(self) -> Lyrics:
-        return(Lyrics(syncedlyrics.search("{} - {}".format(self.songName, self.artistName))))
+    def _findLyrics(self) -> None:
+        """Uses the cached lyrics right away, otherwise starts a background lookup so polling never waits on the providers."""
+        trackId, songName, artistName = self.trackId, self.songName, self.artistName
+        if self.lyricsCache != None:
+            with self.metrics.measure("lyrics_lookup_seconds", source="cache"):
+                lrc = self.lyricsCache.lookup(trackId, songName, artistName)
+            if lrc is not LyricsCache.MISS:
+                self.lyricsFinder.cancel()  #< A lookup for the previous song may still be running
+                self.lyrics = Lyrics(lrc)
+                self.lyricsPending = False
+                return
+
+        def found(lrc, lyrics, conclusive):
+            if (self.trackId, self.songName) != (trackId, songName):
+                return  #< The song changed while the result was delivered
+            if self.lyricsCache != None and (lrc != None or conclusive):
+                self.lyricsCache.store(lrc, trackId, songName, artistName)
+            with self.publisher.lock:
+                if (self.trackId, self.songName) != (trackId, songName):
+                    return
+                self.lyrics = lyrics or Lyrics(None)
+                self.lyricsPending = False
+                previous = snapshot = None
+                if (self.publisher.snapshot.trackId, self.publisher.snapshot.songName) == (trackId, songName):  #< Otherwise the poller publishes them with the song
+                    previous, snapshot = self.publisher.swap({"lyrics": self.lyrics, "lyricsPending": False})
+            if snapshot != None:
+                self.publisher.notify(previous, snapshot)
+
+        self.lyrics = None
+        self.lyricsPending = True
+        self.lyricsFinder.find("{} - {}".format(songName, artistName), found)
 
-    def getCurrentLyric(self) -> str:
-        if self.lyrics:
-            return(self.lyrics.getLyricsFromTimeStamp(self.progress))
-        return("No lyrics available for this song :(")
-    
-    def getCurrentLyricTimestamp(self, at=None) -> float:
-        if self.lyrics:
-            if at == None:
-                at = self.progress
-            return(self.lyrics.getNearestTimestamp(at))
-        return(0.0)
-    
     def like(self) -> bool:
         """
-        Likes the current song
+        Likes the current song, the request itself is sent in the background by the write queue.
         """
-        current = self.sp.current_playback()
-        if current and current["item"]:
-            track_id = current["item"]["id"]
-            self.sp.current_user_saved_tracks_add([track_id])
-            print(f"Liked song: {current['item']['name']} by {', '.join(artist['name'] for artist in current['item']['artists'])}")
-            return(True)
-        else:
-            print("No song is currently playing.")
-            return(False)
+        return(self._queueWrite(WriteQueue.SAVED_TRACKS, "Liked song: {}"))
     
     def addToPlaylist(self, playlistId) -> bool:
         """
-        Adds the current song to the specified playlist.
+        Adds the current song to the specified playlist, the request itself is sent in the background by the write queue.
         """
-        current = self.sp.current_playback()
+        return(self._queueWrite(WriteQueue.playlistTarget(playlistId), "Added song: {} to playlist " + playlistId + "."))
+
+    def _queueWrite(self, target, message) -> bool:
+        if self.lastPlaybackTime == None or self.clock() - self.lastPlaybackTime > self.maxSnapshotAge:
+            # The current track has to be fetched first, do it off the calling (UI) thread
+            threading.Thread(target=self._queueCurrentTrack, args=(target, message), daemon=True).start()
+            return(True)
+        return(self._queueCurrentTrack(target, message))
+
+    def _queueCurrentTrack(self, target, message) -> bool:
+        current = self.getPlayback(self.maxSnapshotAge)
         if current and current["item"]:
-            track_id = current["item"]["id"]
-            self.sp.playlist_add_items(playlistId, [track_id])
-            print(f"Added song: {current['item']['name']} by {', '.join(artist['name'] for artist in current['item']['artists'])} to playlist {playlistId}.")
+            self.writeQueue.add(target, current["item"]["id"])
+            print(message.format(f"{current['item']['name']} by {', '.join(artist['name'] for artist in current['item']['artists'])}"))
             return(True)
         else:
             print("No song is currently playing.")
             return(False)
 
+class PollingPolicy:
+    """
+    Decides how long the update loop waits before polling Spotify again.
+    Polls fast right after user actions and around the expected end of the track,
+    slowly while paused, unattended (nobody interacts) or while nobody looks (background),
+    and backs off exponentially while no device is active.
+    """
+    def __init__(self, playingInterval=10, fastInterval=0.5, pausedInterval=30, idleInterval=15, maxIdleInterval=120,
+                 fastWindow=3, trackEndMargin=0.5, backoffFactor=2, backgroundInterval=30, unattendedInterval=30, clock=time.monotonic):
+        self.playingInterval = playingInterval
+        self.fastInterval = fastInterval
+        self.pausedInterval = pausedInterval
+        self.idleInterval = idleInterval
+        self.maxIdleInterval = maxIdleInterval
+        self.fastWindow = fastWindow           #< Seconds of fast polling after a user action
+        self.trackEndMargin = trackEndMargin   #< Poll this long after the track is expected to end
+        self.backoffFactor = backoffFactor
+        self.backgroundInterval = backgroundInterval  #< Shortest interval while in the background
+        self.unattendedInterval = unattendedInterval  #< Playing interval while unattended, the track end is still polled on time
+        self.clock = clock
+
+        self.background = False
+        self.unattended = False
+        self.currentInterval = fastInterval    #< Poll soon after starting
+        self.idleStreak = 0
+        self.fastUntil = 0.0
+        self._wake = threading.Event()
+
+    def update(self, isActive, isPlaying=False, progress=0.0, duration=None) -> float:
+        """Computes the interval until the next poll from the result of the last one."""
+        if not isActive:
+            interval = min(self.maxIdleInterval, self.idleInterval * (self.backoffFactor ** self.idleStreak))
+            self.idleStreak += 1
+        else:
+            self.idleStreak = 0
+            if not isPlaying:
+                interval = self.pausedInterval
+            else:
+                interval = self.unattendedInterval if self.unattended else self.playingInterval
+                if duration:
+                    remaining = duration - progress
+                    interval = min(interval, max(self.fastInterval, remaining + self.trackEndMargin))
+            if self.background:
+                interval = max(interval, self.backgroundInterval)  #< Track changes can wait until someone looks
+
+        if self.clock() < self.fastUntil:
+            interval = min(interval, self.fastInterval)
+        self.currentInterval = interval
+        return(interval)
+
+    def setBackground(self, background) -> None:
+        """Slows polling down to backgroundInterval, leaving the background polls right away."""
+        if self.background and not background:
+            self.currentInterval = self.fastInterval
+            self._wake.set()
+        self.background = background
+
+    def setUnattended(self, unattended) -> None:
+        """Polls playing tracks every unattendedInterval seconds, leaving it polls right away."""
+        if self.unattended and not unattended:
+            self.currentInterval = self.fastInterval
+            self._wake.set()
+        self.unattended = unattended
+
+    def notifyAction(self) -> None:
+        """Switches to fast polling after a user action and wakes the update loop."""
+        self.fastUntil = self.clock() + self.fastWindow
+        self.currentInterval = self.fastInterval
+        self._wake.set()
+
+    def wait(self) -> bool:
+        """Blocks for the current interval, or until a user action, returns True if woken by an action."""
+        woken = self._wake.wait(self.currentInterval)
+        self._wake.clear()
+        return(woken)
+
+    def getInterval(self) -> float:
+        return(self.currentInterval)
+
+class StartupReport:
+    """Splits the startup time into phases (imports, auth, first poll) and marks (first frame) to track cold start regressions."""
+    def __init__(self, startedAt=None):
+        self.startedAt = time.perf_counter() if startedAt == None else startedAt  #< perf_counter() value startup is measured from
+        self.phases = {}
+        self.marks = {}
+
+    def add(self, phase, seconds) -> None:
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    @contextmanager
+    def measure(self, phase):
+        """Adds the time spent in the with block to phase."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(phase, time.perf_counter() - start)
+
+    def mark(self, name) -> None:
+        """Records when name first happened, relative to the start."""
+        self.marks.setdefault(name, time.perf_counter() - self.startedAt)
+
+    def getReport(self) -> dict:
+        return({"phases": dict(self.phases), "marks": dict(self.marks)})
+
+    def __str__(self):
+        phases = ", ".join(f"{phase} {seconds:.3f}s" for phase, seconds in self.phases.items())
+        marks = ", ".join(f"{name} at {seconds:.3f}s" for name, seconds in self.marks.items())
+        return(f"Startup: {phases}" + (f" ({marks})" if marks else ""))
+
+class PlaybackClock:
+    """
+    Client side estimate of the playback position, extrapolated on a monotonic clock while playing and still while paused.
+    sync() takes the position Spotify reported to be from the middle of the request (or from the response's own
+    timestamp when it falls inside the request), so the round trip latency is not counted as playback.
+    Differences below snapThreshold seconds are smoothed in over slewTime seconds, larger ones (seeks, track changes)
+    snap. With slewTime at least twice snapThreshold the estimate never runs backwards.
+    """
+    def __init__(self, snapThreshold=0.75, slewTime=1.5, clock=time.monotonic, wallClock=time.time):
+        self.snapThreshold = snapThreshold
+        self.slewTime = slewTime
+        self.clock = clock
+        self.wallClock = wallClock
+        self.snaps = 0
+        self.smoothed = 0
+        self.lastError = 0.0
+        # (position, anchor, playing, correction, correctionStart, trackId), replaced as a whole so readers never see half an update
+        self._state = (0.0, clock(), False, 0.0, 0.0, None)
+
+    def _positionAt(self, state, now) -> float:
+        position, anchor, playing, correction, correctionStart, _ = state
+        if playing:
+            position += now - anchor
+        if correction:
+            position += correction * min(1.0, (now - correctionStart) / self.slewTime)
+        return(position)
+
+    def _getMeasuredAt(self, now, sentAt, receivedAt, serverTimestamp) -> float:
+        """Returns when (on self.clock) the reported position was true."""
+        if sentAt == None or receivedAt == None:
+            return(now)
+        if serverTimestamp:
+            measuredAt = serverTimestamp * 0.001 - (self.wallClock() - now)
+            if sentAt <= measuredAt <= receivedAt:
+                return(measuredAt)  #< Spotify's timestamp is only trusted when it is consistent with the request
+        return((sentAt + receivedAt) / 2)
+
+    def sync(self, progress, isPlaying, sentAt=None, receivedAt=None, serverTimestamp=None, trackId=None) -> float:
+        """
+        Corrects the estimate with a polled position (in seconds), sentAt and receivedAt are self.clock times around
+        the request. Returns the difference between the polled and the estimated position.
+        """
+        now = self.clock()
+        target = progress
+        if isPlaying:
+            target += now - self._getMeasuredAt(now, sentAt, receivedAt, serverTimestamp)
+        state = self._state
+        current = self._positionAt(state, now)
+        error = target - current
+        if not isPlaying and not state[2] and trackId == state[5] and error == 0.0:
+            pass  #< Still paused at the same position, keep the state so snapshots do not change
+        elif trackId != state[5] or not state[2] or not isPlaying or abs(error) > self.snapThreshold:
+            self._state = (target, now, isPlaying, 0.0, now, trackId)
+            self.snaps += 1
+        else:
+            self._state = (current, now, True, error, now, trackId)
+            self.smoothed += 1
+        self.lastError = error
+        return(error)
+
+    def setTime(self, position) -> None:
+        """Jumps to position (after a seek), keeping the playing state."""
+        state = self._state
+        self._state = (position, self.clock(), state[2], 0.0, 0.0, state[5])
+
+    def getState(self) -> tuple:
+        """Returns the current state, getTime(state) extrapolates from it later."""
+        return(self._state)
+
+    def setState(self, state) -> None:
+        self._state = state
+
+    def encodeState(self, state) -> list:
+        """Returns state with its clock times made relative to now, so another process can decodeState it."""
+        position, anchor, playing, correction, correctionStart, trackId = state
+        now = self.clock()
+        return([position, now - anchor, playing, correction, now - correctionStart, trackId])
+
+    def decodeState(self, encoded) -> tuple:
+        """Returns the state encoded by encodeState (of any PlaybackClock), on this clock."""
+        position, anchorAge, playing, correction, correctionAge, trackId = encoded
+        now = self.clock()
+        return((position, now - anchorAge, playing, correction, now - correctionAge, trackId))
+
+    def getTime(self, state=None) -> float:
+        """Returns the estimated playback position in seconds, from state if given (see getState)."""
+        return(self._positionAt(state or self._state, self.clock()))
+
+    def isPlaying(self) -> bool:
+        return(self._state[2])
+
+    def getStats(self) -> dict:
+        return({"snaps": self.snaps, "smoothed": self.smoothed, "lastError": self.lastError})
+
 class SpotifyPlayer:
-    def __init__(self, secretsFile="secrets.json"):
-        with open(secretsFile, "r") as f:
-            secrets = json.load(f)
-            self.clientID = secrets["spotify"]["clientId"]
-            self.clientSecret = secrets["spotify"]["clientSecret"]
-            self.callbackUri = secrets["spotify"]["callbackUri"]
-
-        self.sp = self._createSpotifyObject()
-        if not self._isAuthenticated():
+    def __init__(self, secretsFile="secrets.json", lyricsCacheFile="lyricsCache.json", pollingPolicy:PollingPolicy=None,
+                 retryPolicies:dict=None, maxSnapshotAge=3.0, writeQueueFile="writeQueue.json", playlistsFile="playlists.json",
+                 connect=True, startupReport:StartupReport=None, transport=None, lyricsProviders:dict=None,
+                 clock=time.monotonic, sleep=time.sleep, metrics:Metrics=None, prefetchDepth=3, wordTimings=False):
+        """
+        retryPolicies maps spotipy method names (e.g. "seek_track") to the RetryPolicy used for them.
+        maxSnapshotAge is how old (in seconds) the last polled playback may be for like and addToPlaylist to reuse it.
+        With connect=False nothing touches the network (or imports spotipy) until connect() or startInBackground() is called.
+        transport is a function returning the spotipy compatible object requests are sent through
+        (a real spotipy.Spotify by default, fakespotify.FakeSpotify for offline runs, secretsFile is not read then), and
+        lyricsProviders maps provider names to functions("title - artist") returning LRC text (the syncedlyrics providers
+        by default), they are queried concurrently. wordTimings asks the default providers for enhanced LRC word timings
+        (for word by word highlighting). clock and sleep drive every timeout and backoff.
+        metrics collects request, lyrics lookup and update loop latencies, it is disabled by default.
+        prefetchDepth is how many upcoming tracks of the queue get their lyrics prefetched (0 to turn prefetching off).
+        """
+        self.metrics = metrics or Metrics()
+        self.clock = clock
+        self.connectRetryPolicy = RetryPolicy(deadline=float("inf"), maxDelay=60, clock=clock, sleep=sleep)  #< Only its backoff is used
+        self.usesSyncedLyrics = lyricsProviders == None
+        self.pollingPolicy = pollingPolicy or PollingPolicy(clock=clock)
+        self.playbackClock = PlaybackClock(clock=clock)
+        self.polls = 0
+        self.startupReport = startupReport or StartupReport()
+        self.connected = False
+        self.clientID = self.clientSecret = self.callbackUri = None
+        if transport == None:  #< Only the default transport logs in with the credentials
+            with open(secretsFile, "r") as f:
+                secrets = json.load(f)
+                self.clientID = secrets["spotify"]["clientId"]
+                self.clientSecret = secrets["spotify"]["clientSecret"]
+                self.callbackUri = secrets["spotify"]["callbackUri"]
+
+        self.sp = SpotifyClient(transport or self._createSpotifyObject, retryPolicies=retryPolicies,
+                                clock=clock, sleep=sleep, metrics=self.metrics)  #< Created on first use
+        self.lyricsCache = LyricsCache(cacheFile=lyricsCacheFile)
+        self.writeQueue = WriteQueue(self.sp, queueFile=writeQueueFile)
+        self.playlists = PlaylistCatalog(self.sp, cacheFile=playlistsFile)
+        self.song = Song(self.sp, lyricsCache=self.lyricsCache, writeQueue=self.writeQueue, maxSnapshotAge=maxSnapshotAge,
+                         clock=clock, lyricsFinder=LyricsFinder(lyricsProviders or makeLyricsProviders(wordTimings=wordTimings), metrics=self.metrics), metrics=self.metrics,
+                         prefetchDepth=prefetchDepth, playbackClock=self.playbackClock)
+        if connect:
+            self.connect()
+
+    def connect(self) -> bool:
+        """Creates the Spotify session and authenticates, running the OAuth login flow on first use."""
+        with self.startupReport.measure("imports"):
+            self.sp.getSpotify()
+        with self.startupReport.measure("auth"):
+            self.connected = self.sp.authenticate()
+        self.song.publish(connected=self.connected)
+        if not self.connected:
             print("Authentication failed. Please check your credentials.")
-            return
+        return(self.connected)
+
+    def connectUntilConnected(self) -> None:
+        """Calls connect() until it succeeds (e.g. on a device that boots before its network is up), backing off between attempts."""
+        attempt = 0
+        while True:
+            try:
+                if self.connect():
+                    return
+            except Exception as e:
+                print(f"Failed to connect to Spotify: {e}")
+            delay = self.connectRetryPolicy.getDelay(attempt)
+            print(f"Retrying to connect in {delay:.1f} seconds.")
+            self.connectRetryPolicy.sleep(delay)
+            attempt += 1
 
-        self.song = Song(self.sp)
+    def startInBackground(self, callback=None, playlistsCallback=None) -> None:
+        """
+        Connects (retrying until it succeeds), polls once, then starts the update loop and loads the playlists, all on a
+        background thread so the caller can show its first frame right away. The callbacks are the ones of startUpdateLoop and loadPlaylists.
+        """
+        def start():
+            self.connectUntilConnected()
+            if self.usesSyncedLyrics:
+                with self.startupReport.measure("imports"):
+                    import syncedlyrics  #< Warm up the import before the first lyrics lookup needs it
+            with self.startupReport.measure("firstPoll"):
+                try:
+                    self._updateSongInfo()
+                except Exception as e:
+                    print(f"Failed to update the song info: {e}")
+            if callable(callback):
+                callback(self.song)
+            print(self.startupReport)
+            self.startUpdateLoop(callback=callback)
+            self.loadPlaylists(callback=playlistsCallback)
+
+        threading.Thread(target=start, daemon=True).start()
+
+    def getStartupReport(self) -> dict:
+        """Returns the startup time split into phases, in seconds."""
+        return(self.startupReport.getReport())
     
-    def _createSpotifyObject(self) -> spotipy.Spotify:
+    def _createSpotifyObject(self) -> "spotipy.Spotify":
         """
         Creates a Spotify object with the current authentication.
         """
+        import requests
+        import spotipy
+        from spotipy.oauth2 import SpotifyOAuth
         return(spotipy.Spotify(auth_manager=SpotifyOAuth(
             client_id=self.clientID,
             client_secret=self.clientSecret,
             redirect_uri=self.callbackUri,
-            scope="user-read-playback-state user-modify-playback-state user-library-modify playlist-modify-public playlist-modify-private"
-        )))
+            scope="user-read-playback-state user-read-currently-playing user-modify-playback-state user-library-modify "
+                  "playlist-modify-public playlist-modify-private"  #< GET /me/player/queue needs user-read-currently-playing
+        ), requests_session=requests.Session()))  #< A plain session has no transport retries, 429s reach SpotifyClient with their Retry-After
 
     def _isAuthenticated(self) -> bool:
-        if not retryOnTimeout(self.sp.current_user):
-            return(False)
-        return(True)
+        return(self.sp.isAuthenticated())
     
     def _updateSongInfo(self) -> None:
         """
@@ -214,15 +1400,21 @@ class SpotifyPlayer:
 
     def next(self) -> None:
         """Skips to the next track on the user"s active device."""
+        import pyautogui
         pyautogui.press("nexttrack")
+        self.pollingPolicy.notifyAction()
 
     def previous(self) -> None:
         """Goes back to the previous track on the user"s active device."""
+        import pyautogui
         pyautogui.press("prevtrack")
+        self.pollingPolicy.notifyAction()
 
     def pausePlay(self) -> None:
         """Pauses/Plays playback on the user"s active device."""
+        import pyautogui
         pyautogui.press("playpause")
+        self.pollingPolicy.notifyAction()
 
     def pause(self) -> None:
         """Pauses playback on the user"s active device."""
@@ -236,26 +1428,45 @@ class SpotifyPlayer:
             self.pausePlay()
 
     def getLyrics(self) -> Lyrics:
-        """Returns the lyrics object of the currently playing song."""
-        return(self.song.lyrics.getLyrics() if self.song.lyrics else "No lyrics available for this song :(")
+        """Returns the lyrics of the currently playing song as a string."""
+        return(self.song.getSnapshot().getLyricsText())
+
+    def getSnapshot(self) -> PlaybackSnapshot:
+        """
+        Returns the last published playback snapshot. Read it once and use it for a whole frame,
+        the getters below each read the latest one and may disagree while the poller publishes.
+        """
+        return(self.song.getSnapshot())
+
+    def addSnapshotListener(self, callback, fields=None) -> None:
+        """callback(snapshot, changed) is called from a background thread when one of fields (any by default) changed."""
+        self.song.addSnapshotListener(callback, fields)
+
+    def getLyricsFinderStats(self) -> dict:
+        """Returns the lyrics lookups started, cancelled and timed out, and how often each provider won."""
+        return(self.song.lyricsFinder.getStats())
+
+    def getPrefetchStats(self) -> dict:
+        """Returns how many songs started with prefetched lyrics (hits) and how many lookups the prefetcher made."""
+        return(self.song.prefetcher.getStats() if self.song.prefetcher else {})
+
+    def getLyricsTimeline(self) -> Lyrics:
+        """Returns the Lyrics object of the currently playing song, or None if there is none yet."""
+        return(self.song.getSnapshot().lyrics)
 
     def getCurrentLyrics(self) -> str:
-        """Returns the currently playing song lyrics."""
-        return(self.song.getCurrentLyric())
+        """Returns the lyric line playing now."""
+        snapshot = self.song.getSnapshot()
+        if snapshot.lyrics:
+            return(snapshot.lyrics.getLyricsFromTimeStamp(snapshot.getPosition()))
+        return("No lyrics available for this song :(")
 
     def getCurrentLyricIndex(self, timestamp=None, at=None) -> int:
-        if self.song.lyrics:
-            if timestamp == None:
-                timestamp = self.song.getCurrentLyricTimestamp(at=at)
-            index = list(self.song.lyrics.lyrics.keys()).index(timestamp)
-            return(index)
-        return(-1)
+        return(self.song.getSnapshot().getLyricIndex(timestamp if timestamp != None else at))
     
     def isSynced(self) -> bool:
         """Returns True if the lyrics are synced, False otherwise."""
-        if self.song.lyrics == None:
-            return(False)
-        return(self.song.lyrics.isSynced())
+        return(self.song.getSnapshot().isSynced())
     
     def likeCurrentSong(self) -> bool:
         """Likes the currently playing song on the user"s active device."""
@@ -263,12 +1474,32 @@ class SpotifyPlayer:
     
     def getCurrentTime(self) -> float:
         """Returns the current playback time of the currently playing song in seconds."""
-        return(self.song.progress)
+        return(self.song.getSnapshot().progress)
+
+    def getPlaybackPosition(self) -> float:
+        """Returns the playback position extrapolated from the last poll, in seconds."""
+        return(self.song.getSnapshot().getPosition())
     
     def getAvailablePlaylists(self) -> list:
-        """Returns a list of available playlists for the user."""
-        playlists = self.sp.current_user_playlists()
-        return([{"id": pl["id"], "name": pl["name"]} for pl in playlists["items"]])
+        """Returns the user's playlists known so far (from the disk cache until loadPlaylists has run)."""
+        return(self.playlists.getPlaylists())
+
+    def loadPlaylists(self, callback=None) -> None:
+        """
+        Loads every page of the user's playlists in the background.
+        callback(playlists) is called from the loading thread each time the list changes.
+        """
+        if callable(callback):
+            self.playlists.addListener(callback)
+        self.playlists.load()
+
+    def getPlaylistByName(self, name) -> dict:
+        """Returns the playlist with the given name, or None."""
+        return(self.playlists.getByName(name))
+
+    def getPlaylistById(self, playlistId) -> dict:
+        """Returns the playlist with the given id, or None."""
+        return(self.playlists.getById(playlistId))
 
     def addToPlaylist(self, playlistId) -> bool:
         """Adds the currently playing song to the specified playlist."""
@@ -276,17 +1507,41 @@ class SpotifyPlayer:
     
     def getSongDuration(self) -> float:
         """Returns the duration of the currently playing song in seconds."""
-        return(self.song.duration)
+        return(self.song.getSnapshot().duration)
     
     def getPlaybackProgressPercent(self) -> float:
         """Returns the playback progress of the currently playing song in seconds."""
-        return(self.song.progress/self.song.duration if self.song.duration else 0.0)
+        return(self.song.getSnapshot().getProgressPercent())
+
+    def getRequestBudget(self) -> dict:
+        """Returns the current state of the shared request budget, including throttle events."""
+        return(self.sp.budget.getState())
+
+    def getConnectionState(self) -> str:
+        """Returns the state of the Spotify circuit breaker ("closed", "open" or "half-open")."""
+        return(self.sp.breaker.getState())
+
+    def getRequestCounts(self) -> dict:
+        """Returns the number of Spotify requests made so far, by endpoint."""
+        return(self.sp.getRequestCounts())
+
+    def getWriteQueueStats(self) -> dict:
+        """Returns the number of pending, sent and failed likes and playlist additions."""
+        return(self.writeQueue.getStats())
+
+    def getMetrics(self) -> dict:
+        """Returns a snapshot of the collected metrics (empty unless metrics are enabled)."""
+        return(self.metrics.getSnapshot())
+
+    def getLyricsCacheStats(self) -> dict:
+        """Returns the hit/miss counters of the lyrics cache."""
+        return(self.lyricsCache.getStats())
 
     def isPlaying(self) -> bool:
         """
         Returns True if a song is currently playing, False otherwise.
         """
-        return(self.song.isPlaying)
+        return(self.song.getSnapshot().isPlaying)
 
     def seekTo(self, seconds) -> None:
         """
@@ -295,6 +1550,8 @@ class SpotifyPlayer:
         try:
             if self._isAuthenticated():
                 self.sp.seek_track(int(seconds * 1000))
+                self.song.setPosition(seconds)
+                self.pollingPolicy.notifyAction()
         except:   #< If not premium user, this will fail
             print("Seeking is not supported for non-premium users or if the song is not playing.")
             pass
@@ -303,18 +1560,60 @@ class SpotifyPlayer:
         """
         Seeks to the specified percentage of the currently playing song.
         """
-        if self._isAuthenticated() and self.song.duration is not None:
-            seconds = self.song.duration * percent
+        duration = self.song.getSnapshot().duration
+        if self._isAuthenticated() and duration is not None:
+            seconds = duration * percent
             self.seekTo(seconds)
 
-    def startUpdateLoop(self, updateInterval=1, callback=None) -> None:
+    def getPollingInterval(self) -> float:
+        """Returns the current interval between playback polls in seconds."""
+        return(self.pollingPolicy.getInterval())
+
+    def getPollCount(self) -> int:
+        """Returns the number of polls made so far."""
+        return(self.polls)
+
+    def setBackground(self, background) -> None:
+        """
+        Polls at most every pollingPolicy.backgroundInterval seconds while nothing shows the playback
+        (e.g. the window is minimized), and right away once it is shown again.
+        """
+        self.pollingPolicy.setBackground(background)
+
+    def setUnattended(self, unattended) -> None:
         """
-        Starts a loop that updates the song info and lyrics at the specified interval.
+        Polls a playing track every pollingPolicy.unattendedInterval seconds while the playback is shown but nobody
+        interacts with it (e.g. an idle unfocused window). The end of the track is still polled on time.
         """
+        self.pollingPolicy.setUnattended(unattended)
+
+    def poll(self) -> bool:
+        """Polls Spotify once and lets the polling policy pick the next interval, returns True if a device is active."""
+        self.polls += 1
+        try:
+            with self.metrics.measure("update_poll_seconds"):
+                isActive = self._updateSongInfo() != None
+        except Exception as e:  #< Keep polling, the policy backs off while Spotify is unreachable
+            print(f"Failed to update the song info: {e}")
+            isActive = False
+        self.pollingPolicy.update(isActive, self.song.isPlaying, self.song.progress, self.song.duration)
+        return(isActive)
+
+    def startUpdateLoop(self, updateInterval=None, callback=None) -> None:
+        """
+        Starts a loop that updates the song info and lyrics.
+        The interval between polls is chosen by the polling policy, updateInterval overrides its playing interval.
+        """
+        if updateInterval != None:
+            self.pollingPolicy.playingInterval = updateInterval
+
         def loop():
             while True:
-                time.sleep(updateInterval)
-                self._updateSongInfo()
+                interval = self.pollingPolicy.getInterval()
+                start = self.clock()
+                if not self.pollingPolicy.wait():
+                    self.metrics.observe("update_loop_lag_seconds", max(0.0, self.clock() - start - interval))
+                self.poll()
                 if callable(callback):
                     callback(self.song)
         
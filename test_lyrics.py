@@ -0,0 +1,48 @@
+"""
+Tests of the LRC parser behind Lyrics.
+
+    python -m unittest test_lyrics
+"""
+import unittest
+
+from spotify import Lyrics
+
+class LyricsParserTest(unittest.TestCase):
+    def testSeveralTimestampsShareOneLine(self):
+        lyrics = Lyrics("[00:10.00][01:00.00]chorus\n[00:20.00]verse\n")
+        self.assertTrue(lyrics.isSynced())
+        self.assertEqual(list(lyrics.timestamps), [0.0, 10.0, 20.0, 60.0])
+        self.assertEqual(lyrics.lines, ("", "chorus", "verse", "chorus"))
+
+    def testOffsetShowsTheLyricsEarlier(self):
+        lyrics = Lyrics("[ti:Song]\n[offset:500]\n[00:10.00]first\n[00:20.00]second\n")
+        self.assertEqual(lyrics.metadata, {"ti": "Song", "offset": "500"})
+        self.assertEqual(list(lyrics.timestamps), [0.0, 9.5, 19.5])
+        self.assertEqual(lyrics.getLyricsFromTimeStamp(9.6), "first")
+
+    def testBracketedTextIsNotATag(self):
+        lyrics = Lyrics("[00:05.00][Chorus] la la\n[00:08.00]end\n")
+        self.assertEqual(lyrics.lines, ("", "[Chorus] la la", "end"))
+        self.assertEqual(lyrics.metadata, {})
+
+    def testSingleLineAtZeroIsSynced(self):
+        lyrics = Lyrics("[00:00.00]only line")
+        self.assertTrue(lyrics.isSynced())
+        self.assertEqual(lyrics.lines, ("only line",))
+        self.assertEqual(lyrics.getLyricsFromTimeStamp(42.0), "only line")
+
+    def testTextWithoutTimeTagsIsUnsynced(self):
+        for text in ("just some words\nand more", "[ar:Artist]\nplain"):
+            lyrics = Lyrics(text)
+            self.assertFalse(lyrics.isSynced())
+            self.assertEqual(lyrics.lines, (text,))
+        self.assertFalse(Lyrics(None).isSynced())
+
+    def testWordTimings(self):
+        lyrics = Lyrics("[00:30.00]<00:30.00> one <00:30.50> two\n")
+        self.assertTrue(lyrics.hasWordTimings())
+        self.assertEqual([start for start, _ in lyrics.getWords(1)], [30.0, 30.5])
+        self.assertEqual(lyrics.getWordIndex(1, 30.6), 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+"""
+Tests of the playback daemon protocol against the offline fake Spotify (fakespotify.py).
+
+    python -m unittest test_playbackdaemon
+"""
+import json
+import time
+import random
+import socket
+import tempfile
+import threading
+import unittest
+
+from spotify import SpotifyPlayer, Lyrics
+from fakespotify import SimulatedClock, FakeSpotify, FakeLyricsProvider, makeLibrary, makeLrc, getOfflineFiles
+from playbackdaemon import PlaybackDaemon, RemotePlayer
+
+def waitUntil(condition, timeout=5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return(True)
+        time.sleep(0.01)
+    return(condition())
+
+class PlaybackDaemonTest(unittest.TestCase):
+    def setUp(self):
+        self.workDir = tempfile.TemporaryDirectory()
+        clock = SimulatedClock()
+        self.library = makeLibrary(trackCount=3, playlistCount=5)
+        fake = FakeSpotify(self.library, clock=clock)
+        self.player = SpotifyPlayer(connect=False, transport=lambda: fake, lyricsProviders={"fake": FakeLyricsProvider(self.library)},
+                                    clock=clock.now, sleep=clock.sleep, prefetchDepth=0, **getOfflineFiles(self.workDir.name))
+        self.daemon = None
+        self.remotes = []
+
+    def tearDown(self):
+        for remote in self.remotes:
+            remote.close()
+        if self.daemon != None:
+            self.daemon.stop()
+        self.player.lyricsCache.flush()
+        self.workDir.cleanup()
+
+    def startDaemon(self, **kwargs) -> PlaybackDaemon:
+        self.daemon = PlaybackDaemon(self.player, port=0, **kwargs)
+        self.daemon.start()
+        return(self.daemon)
+
+    def connectRemote(self) -> RemotePlayer:
+        remote = RemotePlayer(port=self.daemon.port, reconnectDelay=0.1)
+        remote.startInBackground()
+        self.remotes.append(remote)
+        self.assertTrue(waitUntil(lambda: remote.getSnapshot().connected))
+        return(remote)
+
+    def publishLyrics(self, count, lineCount=2000) -> threading.Thread:
+        """Publishes count large lyrics on a thread, so a publish stuck on the daemon lock shows up as a timeout."""
+        def publish():
+            for i in range(count):
+                self.player.song.publish(lyrics=Lyrics(makeLrc([line * 2.0 for line in range(lineCount)], random.Random(i))))
+        thread = threading.Thread(target=publish, daemon=True)
+        thread.start()
+        return(thread)
+
+    def testSnapshotsAndPlaylistsReachRemotePlayers(self):
+        self.startDaemon()
+        remote = self.connectRemote()
+        self.assertTrue(waitUntil(lambda: remote.getSnapshot().trackId == self.player.getSnapshot().trackId != None))
+        self.assertTrue(waitUntil(lambda: len(remote.getAvailablePlaylists()) == len(self.library["playlists"])))
+        playlist = self.library["playlists"][2]
+        self.assertEqual(remote.getPlaylistByName(playlist["name"])["id"], playlist["id"])
+        self.assertEqual(remote.getPlaylistById(playlist["id"])["name"], playlist["name"])
+
+        remote.seekTo(42.0)
+        self.assertTrue(waitUntil(lambda: abs(remote.getPlaybackPosition() - self.player.getPlaybackPosition()) < 0.5))
+
+    def testSlowClientIsDroppedWithoutStallingTheOthers(self):
+        self.startDaemon(maxQueued=8)
+        remote = self.connectRemote()
+        slow = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        slow.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+        slow.connect(("127.0.0.1", self.daemon.port))  #< Never reads
+        self.assertTrue(waitUntil(lambda: self.daemon.getStats()["clients"] == 2))
+
+        publisher = self.publishLyrics(50)
+        publisher.join(10.0)
+        self.assertFalse(publisher.is_alive(), "publishing deadlocked while dropping the slow client")
+        self.assertTrue(waitUntil(lambda: self.daemon.getStats()["clients"] == 1))
+        self.assertEqual(self.daemon.getStats()["dropped"], 1)
+        latest = self.player.getSnapshot().lyrics.source
+        self.assertTrue(waitUntil(lambda: remote.getSnapshot().lyrics != None and remote.getSnapshot().lyrics.source == latest))
+        slow.close()
+
+    def testMalformedMessagesAreSkipped(self):
+        self.startDaemon()
+        raw = socket.create_connection(("127.0.0.1", self.daemon.port), timeout=5.0)  #< A dead reader thread fails the test instead of hanging it
+        self.assertTrue(waitUntil(lambda: self.daemon.getStats()["clients"] == 1))
+        raw.sendall(b'not json\n[1,2]\n{"op":"sub","fields":5}\n{"op":"sub","fields":[["isPlaying"]]}\n'
+                    b'{"op":"call","name":"seekTo","args":5,"id":1}\n{"op":"call","name":["seekTo"],"id":2}\n'
+                    b'{"op":"call","name":"seekTo","args":[12.0],"id":3}\n')
+        replies = {}
+        reader = raw.makefile("rb")
+        while len(replies) < 3:
+            message = json.loads(reader.readline())
+            if message["op"] == "reply":
+                replies[message["id"]] = message
+        self.assertIn("error", replies[1])
+        self.assertIn("error", replies[2])
+        self.assertNotIn("error", replies[3])
+        self.assertEqual(self.daemon.getStats()["clients"], 1)
+
+        reader.close()
+        raw.close()
+        self.assertTrue(waitUntil(lambda: self.daemon.getStats()["clients"] == 0))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,156 @@
+import time
+import atexit
+import threading
+from collections import OrderedDict
+
+from cache import readJson, writeJsonAtomic
+
+def isPermanentError(error) -> bool:
+    """4xx responses other than 401 (token refresh) and 429 (rate limit) will fail again, so they are not retried."""
+    status = getattr(error, "http_status", None)
+    return(status != None and 400 <= status < 500 and status not in (401, 429))
+
+class WriteQueue:
+    """
+    Background queue for likes and playlist additions.
+    Writes return immediately, a worker thread groups them per target into batched requests
+    and sends a batch once it is full or its oldest write has waited flushDelay seconds.
+    Failed batches are retried with backoff, and pending writes are saved to queueFile so they survive a restart
+    (by the worker thread, so add() never waits for the disk).
+    """
+    SAVED_TRACKS = "saved"
+    PLAYLIST_PREFIX = "playlist:"
+    SAVED_TRACKS_BATCH = 50   #< current_user_saved_tracks_add accepts up to 50 ids
+    PLAYLIST_BATCH = 100      #< playlist_add_items accepts up to 100 ids
+
+    def __init__(self, sp, queueFile="writeQueue.json", flushDelay=1.0, retryDelay=5.0, maxRetryDelay=300.0):
+        self.sp = sp
+        self.queueFile = queueFile
+        self.flushDelay = flushDelay
+        self.retryDelay = retryDelay
+        self.maxRetryDelay = maxRetryDelay
+        self.sent = 0
+        self.batches = 0
+        self.failures = 0
+        self.dropped = 0
+
+        self._pending = OrderedDict(readJson(queueFile, default={}))  #< target -> [{"trackId": str, "queuedAt": float}]
+        self._retryAt = {}
+        self._retryCount = {}
+        self._dirty = False  #< _pending changed since it was last saved
+        self._cond = threading.Condition()
+        self._saveLock = threading.Lock()  #< Keeps the saves in order, the latest copy is written last
+        self._sendLock = threading.Lock()  #< flush() and the worker must not send the same writes twice
+        threading.Thread(target=self._run, daemon=True).start()
+        atexit.register(self._save)  #< Writes queued just before exit, before the worker got to them
+
+    @classmethod
+    def playlistTarget(cls, playlistId) -> str:
+        return(cls.PLAYLIST_PREFIX + playlistId)
+
+    def add(self, target, trackId) -> None:
+        """Queues trackId to be saved to target (WriteQueue.SAVED_TRACKS or a playlistTarget)."""
+        with self._cond:
+            self._pending.setdefault(target, []).append({"trackId": trackId, "queuedAt": time.time()})
+            self._dirty = True
+            self._cond.notify()  #< The worker saves it
+
+    def flush(self) -> None:
+        """Sends every pending write now, ignoring the flush delay and retry backoff."""
+        with self._cond:
+            targets = list(self._pending)
+            self._retryAt.clear()
+        for target in targets:
+            self._send(target)
+
+    def _save(self) -> None:
+        """Writes the pending writes if they changed, copying them under _cond but writing outside it."""
+        with self._saveLock:
+            with self._cond:
+                if not self._dirty:
+                    return
+                pending = {target: list(writes) for target, writes in self._pending.items()}
+                self._dirty = False
+            try:
+                writeJsonAtomic(self.queueFile, pending)
+            except OSError as e:
+                print(f"Failed to save write queue {self.queueFile}: {e}")
+
+    def _getBatchSize(self, target) -> int:
+        return(self.SAVED_TRACKS_BATCH if target == self.SAVED_TRACKS else self.PLAYLIST_BATCH)
+
+    def _getDueTime(self, target) -> float:
+        """Returns when target should be sent next."""
+        writes = self._pending[target]
+        due = 0.0 if len(writes) >= self._getBatchSize(target) else writes[0]["queuedAt"] + self.flushDelay
+        return(max(due, self._retryAt.get(target, 0.0)))
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    now = time.time()
+                    dueTimes = {target: self._getDueTime(target) for target in self._pending if self._pending[target]}
+                    due = [target for target, dueTime in dueTimes.items() if dueTime <= now]
+                    if due or self._dirty:
+                        break
+                    self._cond.wait(min(dueTimes.values()) - now if dueTimes else None)
+            self._save()
+            for target in due:
+                self._send(target)
+
+    def _send(self, target) -> None:
+        with self._sendLock:
+            self._sendBatch(target)
+
+    def _sendBatch(self, target) -> None:
+        with self._cond:
+            writes = self._pending.get(target, [])[:self._getBatchSize(target)]
+        if not writes:
+            return
+        trackIds = list(dict.fromkeys(write["trackId"] for write in writes))  #< Drop duplicates, keep order
+
+        try:
+            if target == self.SAVED_TRACKS:
+                self.sp.current_user_saved_tracks_add(trackIds)
+            else:
+                self.sp.playlist_add_items(target[len(self.PLAYLIST_PREFIX):], trackIds)
+        except Exception as e:
+            with self._cond:
+                if isPermanentError(e):
+                    print(f"Dropping {len(writes)} writes to {target}, Spotify rejected them: {e}")
+                    self.dropped += len(writes)
+                    self._remove(target, len(writes))
+                else:
+                    self.failures += 1
+                    retries = self._retryCount.get(target, 0) + 1
+                    self._retryCount[target] = retries
+                    self._retryAt[target] = time.time() + min(self.maxRetryDelay, self.retryDelay * (2 ** (retries - 1)))
+                    print(f"Failed to send {len(writes)} writes to {target}, will retry: {e}")
+            self._save()  #< Only writes when writes were dropped
+            return
+
+        with self._cond:
+            self.sent += len(writes)
+            self.batches += 1
+            self._retryCount.pop(target, None)
+            self._retryAt.pop(target, None)
+            self._remove(target, len(writes))
+        self._save()
+
+    def _remove(self, target, count) -> None:
+        """Removes the first count writes of target, which were sent (or dropped) as one batch."""
+        del self._pending[target][:count]
+        if not self._pending[target]:
+            del self._pending[target]
+        self._dirty = True
+
+    def getStats(self) -> dict:
+        with self._cond:
+            return({
+                "pending": sum(len(writes) for writes in self._pending.values()),
+                "sent": self.sent,
+                "batches": self.batches,
+                "failures": self.failures,
+                "dropped": self.dropped
+            })